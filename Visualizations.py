@@ -39,9 +39,16 @@ sns.heatmap(df[['estimated_spend', 'estimated_impressions', 'estimated_audience_
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from rollups import load_rollup
 
-# Load your processed housing dataset
-df = pd.read_csv("./data/processed/updated_processed_data.csv")
+# Fixed-bin histograms precomputed by data_preprocessing.py
+hist = load_rollup("histograms")
+
+
+def plot_histogram(metric):
+    bins = hist[hist["metric"] == metric]
+    plt.bar(bins["left"], bins["count"], width=bins["right"] - bins["left"], align="edge",
+            color="#4A90E2", edgecolor="black", alpha=0.6)
 
 sns.set(style="whitegrid", font_scale=1.2)
 
@@ -49,7 +56,7 @@ sns.set(style="whitegrid", font_scale=1.2)
 # 1️⃣ Distribution of market_heat_index
 # ------------------------------
 plt.figure(figsize=(12, 6))
-sns.histplot(df["market_heat_index"], bins=30, kde=True, color="#4A90E2", edgecolor="black", alpha=0.6)
+plot_histogram("market_heat_index")
 plt.title("Distribution of market_heat_index")
 plt.xlabel("market_heat_index")
 plt.ylabel("Frequency")
@@ -60,7 +67,7 @@ plt.show()
 # 2️⃣ Distribution of Percent Sold Above List
 # ------------------------------
 plt.figure(figsize=(12, 6))
-sns.histplot(df["percent_sold_above_list_all_homes"], bins=30, kde=True, color="#4A90E2", edgecolor="black", alpha=0.6)
+plot_histogram("percent_sold_above_list_all_homes")
 plt.title("Distribution of Percent Sold Above List (All Homes)")
 plt.xlabel("Percent Sold Above List")
 plt.ylabel("Frequency")
@@ -1,129 +1,290 @@
-# app.py
-import streamlit as st
-import pandas as pd
-import numpy as np
-import pickle
-import os
-import plotly.graph_objects as go
-from sklearn.preprocessing import StandardScaler
-
-# Load custom CSS
-with open("style.css") as f:
-    st.markdown(f"<style>{f.read()}</style>", unsafe_allow_html=True)
-
-st.markdown("<h1 style='text-align:center;'>🏠 Housing Market Future Value Prediction (ZHVI)</h1>", unsafe_allow_html=True)
-st.markdown("<p style='text-align:center; color:white;'>Predict home value changes using ML models.<br>Target = <b>zhvi_all_homes_smoothed</b></p>", unsafe_allow_html=True)
-
-# Paths
-data_path = "./Data/processed/updated_processed_data.csv"
-model_path = "./Models/"
-output_path = "./outputs/"
-
-# Load Data + Scaler
-@st.cache_data
-def load_data():
-    data = pd.read_csv(data_path)
-    with open(os.path.join(model_path, "scaler.pkl"), "rb") as f:
-        scaler = pickle.load(f)
-    return data, scaler
-
-data, scaler = load_data()
-
-# Model List
-model_files = {
-    "Random Forest": "random_forest.pkl",
-    "Gradient Boosting": "gradient_boosting.pkl",
-    "XGBoost": "xgboost.pkl",
-    "LightGBM": "lightgbm.pkl",
-    "Decision Tree": "decision_tree.pkl",
-    "Linear Regression": "linear_regression.pkl",
-    "Lasso Regression": "lasso_regression.pkl",
-}
-
-def load_model(name):
-    with open(os.path.join(model_path, name), "rb") as f:
-        return pickle.load(f)
-
-# Inputs UI
-st.subheader("🔍 Prediction Settings")
-
-col1, col2, col3 = st.columns(3)
-with col1:
-    selected_model = st.selectbox("Choose Model", list(model_files.keys()))
-with col2:
-    selected_city = st.selectbox("Choose City", sorted(data["RegionName"].unique()))
-with col3:
-    extra_units = st.number_input("Extra Housing Units", min_value=0, step=1)
-
-model = load_model(model_files[selected_model])
-city_data = data[data["RegionName"] == selected_city]
-
-# Ensure interaction features
-city_data["Housing_Market_Interaction"] = (
-    city_data["City_Housing_Starts"] * city_data["market_heat_index"]
-)
-city_data["Housing_Sales_Ratio"] = (
-    city_data["City_Housing_Starts"] / (city_data["sales_count_nowcast"] + 1)
-)
-
-# Prediction Function
-def predict(df, extra):
-    df = df.copy()
-    df["City_Housing_Starts"] += extra
-    df["Housing_Market_Interaction"] = (
-        df["City_Housing_Starts"] * df["market_heat_index"]
-    )
-    df["Housing_Sales_Ratio"] = (
-        df["City_Housing_Starts"] / (df["sales_count_nowcast"] + 1)
-    )
-
-    features = [
-        "City_Housing_Starts",
-        "new_construction_sales_all_homes",
-        "market_heat_index",
-        "percent_sold_above_list_all_homes",
-        "percent_sold_below_list_all_homes",
-        "sales_count_nowcast",
-        "total_transaction_value_all_homes",
-        "zhvi_all_homes_smoothed",
-        "Housing_Market_Interaction",
-        "Housing_Sales_Ratio",
-    ]
-
-    X = df[features]
-    X_scaled = scaler.transform(X)
-    return model.predict(X_scaled)
-
-# Predictions
-base = predict(city_data, 0)
-new = predict(city_data, extra_units)
-
-st.markdown(f"<h3 style='color:white;'>📊 Predictions for <b>{selected_city}</b></h3>", unsafe_allow_html=True)
-
-# Results Card
-st.markdown(
-    f"""
-    <div class="pred-card">
-        <h4>Baseline ZHVI: ${np.mean(base):,.2f}</h4>
-        <h4>After Adding {extra_units} Units: ${np.mean(new):,.2f}</h4>
-    </div>
-    """,
-    unsafe_allow_html=True
-)
-
-# Visualization
-fig = go.Figure()
-fig.add_trace(go.Scatter(x=city_data["Date"], y=base, mode='lines', name="Baseline", line=dict(color="#00c0ff")))
-fig.add_trace(go.Scatter(x=city_data["Date"], y=new, mode='lines', name="With Extra Units", line=dict(color="#ff007f")))
-
-fig.update_layout(
-    title=f"Impact of Extra Housing Units in {selected_city}",
-    xaxis_title="Date",
-    yaxis_title="Predicted ZHVI",
-    plot_bgcolor="rgba(0,0,0,0)",
-    paper_bgcolor="rgba(0,0,0,0)",
-    font=dict(color="white")
-)
-
-st.plotly_chart(fig, use_container_width=True)
-
+# app.py
+import time
+render_started = time.perf_counter()
+
+import json
+import os
+import sys
+import streamlit as st
+import numpy as np
+from serving_snapshot import load_snapshot
+from model_registry import ModelRegistry
+from features import FEATURES, TARGET
+from scenarios import score_scenarios
+
+# Only NumPy-level modules are imported above. pandas, pyarrow, sklearn and
+# plotly are imported further down, where they are first used, so the header,
+# the inputs and the first chart render before they load.
+
+# Load custom CSS (read once per server process)
+@st.cache_resource
+def load_css():
+    with open("style.css") as f:
+        return f.read()
+
+st.markdown(f"<style>{load_css()}</style>", unsafe_allow_html=True)
+
+st.markdown("<h1 style='text-align:center;'>🏠 Housing Market Future Value Prediction (ZHVI)</h1>", unsafe_allow_html=True)
+st.markdown("<p style='text-align:center; color:white;'>Predict home value changes using ML models.<br>Target = <b>zhvi_all_homes_smoothed</b></p>", unsafe_allow_html=True)
+
+# Paths
+model_path = "./Models/"
+output_path = "./outputs/"
+timing_path = os.path.join(output_path, "dashboard_timing.json")
+
+# Load Data: the serving snapshot built by serving_snapshot.py (memory-mapped
+# city index and scaler parameters) when it matches the current store and
+# scaler, otherwise the per-city index built from the feature store
+@st.cache_resource
+def load_city_index():
+    snapshot = load_snapshot(models_dir=model_path)
+    if snapshot is not None:
+        return snapshot, "snapshot"
+    from feature_store import load_panel
+    from city_index import CityIndex
+    panel = load_panel(columns=["RegionName", "Date"] + FEATURES)
+    return CityIndex(panel.to_frame(), FEATURES), "feature store"
+
+city_index, data_source = load_city_index()
+
+# Model List
+model_files = {
+    "Random Forest": "random_forest.pkl",
+    "Gradient Boosting": "gradient_boosting.pkl",
+    "XGBoost": "xgboost.pkl",
+    "LightGBM": "lightgbm.pkl",
+    "Decision Tree": "decision_tree.pkl",
+    "Linear Regression": "linear_regression.pkl",
+    "Lasso Regression": "lasso_regression.pkl",
+}
+
+# One registry per server process, shared by every rerun and session.
+# The default model (and the scaler, unless the snapshot carries it) are
+# loaded before the first render.
+@st.cache_resource
+def get_registry():
+    registry = ModelRegistry(model_path, max_models=4)
+    registry.preload(([] if data_source == "snapshot" else ["scaler.pkl"]) + [next(iter(model_files.values()))])
+    return registry
+
+registry = get_registry()
+
+# The cached snapshot keeps the scaler it was built with, while the registry
+# picks up retrained models. Once scaler.pkl changes (hash memoized on size and
+# mtime by the registry) the cached index is dropped and reloaded, which falls
+# back to the feature store until serving_snapshot.py is rerun.
+if data_source == "snapshot":
+    try:
+        scaler_current = registry.file_hash("scaler.pkl") == city_index.header["scaler_sha256"]
+    except FileNotFoundError:
+        scaler_current = False
+    if not scaler_current:
+        load_city_index.clear()
+        city_index, data_source = load_city_index()
+
+scaler = city_index.scaler if data_source == "snapshot" else registry.get("scaler.pkl")
+
+def load_model(name):
+    try:
+        return registry.get(name)
+    except FileNotFoundError:
+        st.error(f"Model file {name} was not found in {model_path}.")
+        st.stop()
+
+# Inputs UI
+st.subheader("🔍 Prediction Settings")
+
+col1, col2, col3 = st.columns(3)
+with col1:
+    selected_model = st.selectbox("Choose Model", list(model_files.keys()))
+with col2:
+    selected_city = st.selectbox("Choose City", city_index.cities)
+with col3:
+    extra_units = st.number_input("Extra Housing Units", min_value=0, step=1)
+
+model = load_model(model_files[selected_model])
+city_dates, city_X = city_index.get(selected_city)
+
+# Predictions: baseline and scenario scored in one batched call
+base, new = score_scenarios(model, scaler, city_X, [0, extra_units])
+
+st.markdown(f"<h3 style='color:white;'>📊 Predictions for <b>{selected_city}</b></h3>", unsafe_allow_html=True)
+
+# Results Card
+st.markdown(
+    f"""
+    <div class="pred-card">
+        <h4>Baseline ZHVI: ${np.mean(base):,.2f}</h4>
+        <h4>After Adding {extra_units} Units: ${np.mean(new):,.2f}</h4>
+    </div>
+    """,
+    unsafe_allow_html=True
+)
+
+# Visualization
+import plotly.graph_objects as go
+
+fig = go.Figure()
+fig.add_trace(go.Scatter(x=city_dates, y=base, mode='lines', name="Baseline", line=dict(color="#00c0ff")))
+fig.add_trace(go.Scatter(x=city_dates, y=new, mode='lines', name="With Extra Units", line=dict(color="#ff007f")))
+
+fig.update_layout(
+    title=f"Impact of Extra Housing Units in {selected_city}",
+    xaxis_title="Date",
+    yaxis_title="Predicted ZHVI",
+    plot_bgcolor="rgba(0,0,0,0)",
+    paper_bgcolor="rgba(0,0,0,0)",
+    font=dict(color="white")
+)
+
+st.plotly_chart(fig, use_container_width=True)
+
+
+# Time to first render: from the start of the first script run in this
+# server process (all imports included) to the first chart. Logged once per
+# process and appended to outputs/dashboard_timing.json.
+@st.cache_resource
+def startup_timing():
+    return {}
+
+timing = startup_timing()
+if not timing:
+    timing.update(first_render_s=round(time.perf_counter() - render_started, 3), data_source=data_source,
+                  started=time.time(),
+                  heavy_modules=[m for m in ("pandas", "pyarrow", "sklearn", "xgboost", "lightgbm") if m in sys.modules])
+    print(f"⏱ First render in {timing['first_render_s']:.2f}s ({data_source})")
+    try:
+        history = []
+        if os.path.exists(timing_path):
+            with open(timing_path) as f:
+                history = json.load(f)
+        os.makedirs(output_path, exist_ok=True)
+        with open(timing_path, "w") as f:
+            json.dump((history + [timing])[-100:], f, indent=4)
+    except (OSError, ValueError):
+        pass
+
+
+# Market Context: the city's ZHVI against its state and all metros; the
+# benchmarks come from the rollups written by data_preprocessing.py
+from rollups import load_rollup
+
+@st.cache_data
+def load_market_rollups():
+    try:
+        return {name: load_rollup(name) for name in ["by_date", "by_state", "by_region"]}
+    except FileNotFoundError:
+        return None
+
+st.markdown(f"<h3 style='color:white;'>🗺️ Market context for <b>{selected_city}</b></h3>", unsafe_allow_html=True)
+
+market = load_market_rollups()
+if market is None:
+    st.info("Market context needs the rollups. Run `python data_preprocessing.py` to build them.")
+else:
+    national = market["by_date"][market["by_date"]["metric"] == TARGET]
+    city_rows = market["by_region"][market["by_region"]["RegionName"] == selected_city]
+    state = city_rows["StateName"].iloc[0] if len(city_rows) else None
+    state_rows = market["by_state"][(market["by_state"]["StateName"] == state) & (market["by_state"]["metric"] == TARGET)]
+
+    context_fig = go.Figure()
+    context_fig.add_trace(go.Scatter(x=national["Date"], y=national["p75"], mode="lines", line=dict(width=0), showlegend=False))
+    context_fig.add_trace(go.Scatter(x=national["Date"], y=national["p25"], mode="lines", line=dict(width=0),
+                                     fill="tonexty", fillcolor="rgba(255,255,255,0.15)", name="All metros (25th-75th pct)"))
+    context_fig.add_trace(go.Scatter(x=national["Date"], y=national["p50"], mode="lines", name="All metros (median)", line=dict(color="#aaaaaa")))
+    if len(state_rows):
+        context_fig.add_trace(go.Scatter(x=state_rows["Date"], y=state_rows["p50"], mode="lines", name=f"{state} (median)", line=dict(color="#90be6d")))
+    context_fig.add_trace(go.Scatter(x=city_dates, y=city_X[:, FEATURES.index(TARGET)], mode="lines", name=selected_city, line=dict(color="#00c0ff")))
+    context_fig.update_layout(
+        title=f"ZHVI in {selected_city} vs. {state or 'its state'} and all metros",
+        xaxis_title="Date",
+        yaxis_title="ZHVI",
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="white")
+    )
+    st.plotly_chart(context_fig, use_container_width=True)
+
+
+# Feature Attribution (served from attributions precomputed by shap_analysis.py)
+from attributions import load_city_attributions, SHAP_COLUMNS
+
+st.markdown(f"<h3 style='color:white;'>🧭 What drives the prediction in <b>{selected_city}</b></h3>", unsafe_allow_html=True)
+
+model_file = model_files[selected_model]
+city_shap = load_city_attributions(model_file, selected_city, models_dir=model_path, registry=registry)
+
+if city_shap is None or city_shap.empty:
+    st.info(
+        f"No precomputed attributions for {selected_model} in {selected_city}. "
+        f"Run `python shap_analysis.py --model {model_file}` to build them."
+    )
+else:
+    months = city_shap["Date"].dt.strftime("%Y-%m").tolist()
+    selected_month = st.select_slider("Month", options=months, value=months[-1])
+    row = city_shap.iloc[months.index(selected_month)]
+
+    contributions = row[SHAP_COLUMNS].to_numpy(dtype=float)
+    order = np.argsort(np.abs(contributions))
+
+    shap_fig = go.Figure(go.Bar(
+        x=contributions[order],
+        y=[FEATURES[i] for i in order],
+        orientation="h",
+        marker_color=["#ff007f" if v > 0 else "#00c0ff" for v in contributions[order]],
+    ))
+    shap_fig.update_layout(
+        title=f"Feature contributions to predicted ZHVI ({selected_month})",
+        xaxis_title="SHAP value",
+        plot_bgcolor="rgba(0,0,0,0)",
+        paper_bgcolor="rgba(0,0,0,0)",
+        font=dict(color="white")
+    )
+    st.plotly_chart(shap_fig, use_container_width=True)
+    st.caption(
+        f"Base value ${row['base_value']:,.2f} + contributions ${contributions.sum():,.2f} "
+        f"= ${row['base_value'] + contributions.sum():,.2f}"
+    )
+
+
+# LSTM Forecast: every metro is forecast in one batched call per server
+# process; changing the city only filters the cached result
+from feature_store import load_panel
+from sequences import SequenceDataset, SEQUENCE_FEATURES, WINDOW, feature_scaling, forecast
+
+lstm_file = "lstm_model.h5"
+lstm_steps = 6
+
+@st.cache_resource
+def lstm_forecasts():
+    try:
+        lstm = registry.get(lstm_file)
+    except (FileNotFoundError, ImportError):
+        return None
+    panel = load_panel(columns=["RegionName", "Date"] + SEQUENCE_FEATURES).to_frame()
+    dataset = SequenceDataset(panel, scaling=feature_scaling(scaler))
+    return forecast(lstm, dataset, steps=lstm_steps)
+
+st.markdown(f"<h3 style='color:white;'>📈 LSTM forecast for <b>{selected_city}</b></h3>", unsafe_allow_html=True)
+
+lstm_forecast = lstm_forecasts()
+if lstm_forecast is None:
+    st.info(f"LSTM forecasts need {lstm_file} in {model_path} and TensorFlow installed.")
+else:
+    city_forecast = lstm_forecast[lstm_forecast["RegionName"] == selected_city]
+    if city_forecast.empty:
+        st.info(f"{selected_city} has no complete {WINDOW}-month history window for the LSTM.")
+    else:
+        lstm_fig = go.Figure(go.Scatter(
+            x=city_forecast["Date"], y=city_forecast["prediction"], mode="lines+markers",
+            name="LSTM", line=dict(color="#ffd700"),
+        ))
+        lstm_fig.update_layout(
+            title=f"Next {lstm_steps} months of ZHVI in {selected_city}",
+            xaxis_title="Date",
+            yaxis_title="Forecast ZHVI",
+            plot_bgcolor="rgba(0,0,0,0)",
+            paper_bgcolor="rgba(0,0,0,0)",
+            font=dict(color="white")
+        )
+        st.plotly_chart(lstm_fig, use_container_width=True)
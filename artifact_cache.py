@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from incremental import file_sha256
+
+# -----------------------------
+# PATHS
+# -----------------------------
+cache_path = "./.cache/artifacts/"
+max_cache_bytes = 5 * 2**30
+
+# Memo of file hashes keyed by (size, mtime), so unchanged raw files and
+# stores are not re-read on every run
+HASHES_NAME = "_hashes.json"
+
+# Parquet part files as pyarrow names them: random on every write
+PART_FILE = re.compile(r"^[0-9a-f]{32}-\d+\.parquet$")
+
+
+# -----------------------------
+# HASHING
+# -----------------------------
+class Hasher:
+    def __init__(self, root=cache_path):
+        self.memo_path = os.path.join(root, HASHES_NAME)
+        self._memo = {}
+        if os.path.exists(self.memo_path):
+            with open(self.memo_path) as f:
+                self._memo = json.load(f)
+
+    def file(self, path):
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+        key = os.path.abspath(path)
+        cached = self._memo.get(key)
+        if cached is None or cached[0] != signature:
+            cached = [signature, file_sha256(path)]
+            self._memo[key] = cached
+        return cached[1]
+
+    # Files under a directory, by relative path and content, so renaming or
+    # swapping two files changes the hash. Parquet part files only contribute
+    # their sub-directory (e.g. a Year=2020 partition), since their names are
+    # random on every write. Missing paths hash to "".
+    def path(self, path):
+        if not os.path.exists(path):
+            return ""
+        if os.path.isfile(path):
+            return self.file(path)
+        entries = []
+        for root, _, files in os.walk(path):
+            folder = os.path.relpath(root, path)
+            for name in files:
+                label = folder if PART_FILE.match(name) else os.path.join(folder, name)
+                entries.append((label, self.file(os.path.join(root, name))))
+        return hashlib.sha256(json.dumps(sorted(entries)).encode()).hexdigest()
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.memo_path), exist_ok=True)
+        with open(self.memo_path, "w") as f:
+            json.dump(self._memo, f)
+
+
+# Key of one stage run: everything that can change its outputs
+def stage_key(name, inputs=(), code=(), params=None, hasher=None):
+    hasher = hasher or Hasher()
+    payload = {
+        "stage": name,
+        "inputs": {path: hasher.path(path) for path in inputs},
+        "code": {os.path.basename(path): hasher.file(path) for path in code},
+        "params": params,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def _copy(src, dst):
+    if os.path.isdir(dst):
+        shutil.rmtree(dst)
+    elif os.path.exists(dst):
+        os.remove(dst)
+    if os.path.isdir(src):
+        shutil.copytree(src, dst)
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+        shutil.copy2(src, dst)
+
+
+# -----------------------------
+# ARTIFACT CACHE
+# -----------------------------
+# Stage outputs (files or directories) stored under their stage key. A stage
+# whose key is present restores its outputs instead of running. Entries are
+# evicted least recently used first once the cache exceeds `max_bytes`.
+class ArtifactCache:
+    def __init__(self, root=cache_path, max_bytes=max_cache_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def entry(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def has(self, key):
+        return os.path.exists(os.path.join(self.entry(key), "meta.json"))
+
+    # Copy cached outputs back into place (skipping outputs that already hold
+    # the cached content); False on a miss
+    def restore(self, key, outputs):
+        entry = self.entry(key)
+        if not self.has(key):
+            return False
+        with open(os.path.join(entry, "meta.json")) as f:
+            meta = json.load(f)
+        if sorted(meta["outputs"]) != sorted(outputs):
+            return False
+        hasher = Hasher(self.root)
+        for i, path in enumerate(meta["outputs"]):
+            if meta["present"][i] and hasher.path(path) != meta["hashes"][i]:
+                _copy(os.path.join(entry, str(i)), path)
+        hasher.save()
+        meta["used"] = time.time()
+        with open(os.path.join(entry, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        return True
+
+    def store(self, key, outputs, name=None):
+        entry = self.entry(key)
+        tmp = entry + ".tmp"
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp)
+        os.makedirs(tmp)
+        hasher = Hasher(self.root)
+        present = [os.path.exists(path) for path in outputs]
+        for i, path in enumerate(outputs):
+            if present[i]:
+                _copy(path, os.path.join(tmp, str(i)))
+        meta = {"name": name, "outputs": list(outputs), "present": present,
+                "hashes": [hasher.path(path) for path in outputs], "size": _size(tmp),
+                "created": time.time(), "used": time.time()}
+        hasher.save()
+        # meta.json is written last: its presence marks the entry as complete
+        with open(os.path.join(tmp, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        if os.path.exists(entry):
+            shutil.rmtree(entry)
+        os.replace(tmp, entry)
+        self.evict(keep=key)
+
+    def entries(self):
+        found = []
+        if not os.path.exists(self.root):
+            return found
+        for prefix in os.listdir(self.root):
+            folder = os.path.join(self.root, prefix)
+            if not os.path.isdir(folder):
+                continue
+            for key in os.listdir(folder):
+                meta_path = os.path.join(folder, key, "meta.json")
+                if os.path.exists(meta_path):
+                    with open(meta_path) as f:
+                        found.append((key, json.load(f)))
+        return found
+
+    # Drop least recently used entries until the cache fits the budget
+    def evict(self, keep=None):
+        entries = sorted(self.entries(), key=lambda e: e[1]["used"])
+        total = sum(meta["size"] for _, meta in entries)
+        for key, meta in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self.entry(key), ignore_errors=True)
+            total -= meta["size"]
+        return total
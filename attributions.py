@@ -0,0 +1,208 @@
+import pandas as pd
+import numpy as np
+import glob
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from features import FEATURES, add_interaction_features
+from feature_store import load_data, store_path
+from model_registry import ModelRegistry
+from instrumentation import span
+from serving_snapshot import store_signature
+
+# -----------------------------
+# PATHS
+# -----------------------------
+model_path = "./models/"
+cache_path = "./outputs/shap_cache/"
+
+KEY_COLUMNS = ["RegionID", "RegionName", "Date"]
+# Store columns shap_analysis.py explains
+EXPLAINED_COLUMNS = KEY_COLUMNS + FEATURES
+SHAP_COLUMNS = [f"shap_{feature}" for feature in FEATURES]
+
+
+# -----------------------------
+# SAMPLING + VERSIONING
+# -----------------------------
+# Up to `per_stratum` random rows from every (region, year) stratum, so small
+# metros and early years stay represented. The panel is monthly, so a stratum
+# holds at most 12 rows: the default of 3 explains about a quarter of the
+# rows (one month per quarter on average), and 12 or more explains every row.
+# None keeps every row.
+PER_STRATUM = 3
+
+
+def stratified_sample(data, per_stratum=PER_STRATUM, seed=42):
+    if per_stratum is None:
+        return data
+    shuffled = data.sample(frac=1.0, random_state=seed)
+    strata = [shuffled["RegionID"], pd.to_datetime(shuffled["Date"]).dt.year]
+    keep = shuffled.groupby(strata).cumcount() < per_stratum
+    return shuffled[keep].sort_index()
+
+
+def explained_rows(data):
+    return add_interaction_features(data.copy()).dropna(subset=FEATURES)
+
+
+def data_version(data):
+    hashed = pd.util.hash_pandas_object(data[["RegionID", "Date"] + FEATURES], index=False)
+    return hashlib.sha1(hashed.to_numpy().tobytes()).hexdigest()[:12]
+
+
+# SHAP values are computed on scaled inputs, so the scaler is part of the key
+def cache_file(model_file, model_hash, scaler_hash, version, per_stratum, seed, cache_dir=cache_path):
+    stem = os.path.splitext(model_file)[0]
+    sample = "all" if per_stratum is None else f"s{per_stratum}-seed{seed}"
+    return os.path.join(cache_dir, f"{stem}-{model_hash[:12]}-{scaler_hash[:12]}-{version}-{sample}.parquet")
+
+
+# Write `path` through a uniquely named temp file in the same directory and
+# swap it in, so concurrent writers never share or half-write a file
+def _replace_atomically(path, write):
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=folder, suffix=".tmp", delete=False) as f:
+        tmp = f.name
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _write_json(data):
+    def write(tmp):
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+    return write
+
+
+# -----------------------------
+# PARALLEL SHAP
+# -----------------------------
+# One explainer per worker process, built once and reused for every chunk
+_explainer = None
+
+
+def _init_explainer(model_file_path):
+    global _explainer
+    import shap
+    with open(model_file_path, "rb") as f:
+        model = pickle.load(f)
+    _explainer = shap.TreeExplainer(model)
+
+
+def _explain_chunk(X_scaled):
+    values = np.asarray(_explainer.shap_values(X_scaled), dtype="float64")
+    expected = float(np.ravel(_explainer.expected_value)[0])
+    return values, expected
+
+
+def compute_shap(model_file_path, X_scaled, chunk_rows=5_000, workers=1):
+    if len(X_scaled) == 0:
+        return np.empty((0, len(SHAP_COLUMNS))), np.nan
+    chunks = [X_scaled[i:i + chunk_rows] for i in range(0, len(X_scaled), chunk_rows)]
+    with span(f"shap:{os.path.basename(model_file_path)}", rows=len(X_scaled), workers=workers):
+        if workers <= 1:
+            _init_explainer(model_file_path)
+            results = [_explain_chunk(chunk) for chunk in chunks]
+        else:
+            with ProcessPoolExecutor(workers, initializer=_init_explainer, initargs=(model_file_path,)) as pool:
+                results = list(pool.map(_explain_chunk, chunks))
+    return np.vstack([values for values, _ in results]), results[0][1]
+
+
+# -----------------------------
+# ATTRIBUTION STORE
+# -----------------------------
+# Per-row attributions for `data` under `model_file`, cached on disk by model
+# hash, scaler hash, data version and sampling settings. Repeat runs read the cached file.
+# Returns keys, raw feature values, shap_<feature> columns and base_value,
+# sorted by (RegionName, Date).
+def get_attributions(data, model_file, per_stratum=PER_STRATUM, seed=42, chunk_rows=5_000, workers=1,
+                     models_dir=model_path, cache_dir=cache_path):
+    data = explained_rows(data)
+    registry = ModelRegistry(models_dir)
+    model_hash = registry.file_hash(model_file)
+    scaler_hash = registry.file_hash("scaler.pkl")
+    path = cache_file(model_file, model_hash, scaler_hash, data_version(data), per_stratum, seed, cache_dir)
+
+    if os.path.exists(path):
+        print(f"Using cached attributions: {path}")
+        return pd.read_parquet(path)
+
+    sample = stratified_sample(data, per_stratum, seed)
+    print(f"Computing SHAP values for {len(sample):,} of {len(data):,} rows...")
+    if len(sample):
+        X_scaled = registry.get("scaler.pkl").transform(sample[FEATURES])
+    else:
+        X_scaled = np.empty((0, len(FEATURES)))  # the scaler rejects empty input
+    values, expected = compute_shap(os.path.join(models_dir, model_file), X_scaled, chunk_rows, workers)
+
+    result = sample[KEY_COLUMNS + FEATURES].reset_index(drop=True)
+    result["RegionName"] = result["RegionName"].astype(str)
+    result[SHAP_COLUMNS] = values
+    result["base_value"] = expected
+    result = result.sort_values(["RegionName", "Date"], ignore_index=True)
+
+    _replace_atomically(path, lambda tmp: result.to_parquet(tmp, index=False, row_group_size=50_000))
+    return result
+
+
+# data_version() of the feature store as shap_analysis.py explains it.
+# Memoized in the cache directory under the store's content signature, so
+# the store is only loaded and hashed once per version of it (`data`, when
+# given, is the store already loaded with EXPLAINED_COLUMNS). The memo is
+# only rewritten when the store was rewritten, not on every dashboard rerun.
+def store_data_version(store=store_path, cache_dir=cache_path, data=None):
+    memo_path = os.path.join(cache_dir, "store_version.json")
+    memo = {}
+    if os.path.exists(memo_path):
+        try:
+            with open(memo_path) as f:
+                memo = json.load(f)
+        except (OSError, ValueError):
+            memo = {}
+
+    signature, files = store_signature(store, memo.get("files"))
+    if memo.get("signature") == signature and memo.get("files") == files and "version" in memo:
+        return memo["version"]
+
+    if memo.get("signature") != signature or "version" not in memo:
+        if data is None:
+            data = load_data(columns=EXPLAINED_COLUMNS, path=store)
+        memo["version"] = data_version(explained_rows(data))
+    memo.update(signature=signature, files=files)
+    _replace_atomically(memo_path, _write_json(memo))
+    return memo["version"]
+
+
+# Cached attributions of one city for the current model, scaler and store
+# (None when nothing has been precomputed for them). A model shipped only as
+# its compiled export is matched by the hash of the pickle it was built from.
+# Full attributions are preferred over sampled ones.
+def load_city_attributions(model_file, city, models_dir=model_path, cache_dir=cache_path, registry=None,
+                           store=store_path):
+    registry = registry or ModelRegistry(models_dir)
+    try:
+        model_hash = registry.source_hash(model_file)
+        scaler_hash = registry.file_hash("scaler.pkl")
+    except FileNotFoundError:
+        return None
+    if not glob.glob(os.path.join(cache_dir, "*.parquet")):
+        return None
+
+    stem = os.path.splitext(model_file)[0]
+    version = store_data_version(store, cache_dir)
+    candidates = glob.glob(os.path.join(cache_dir, f"{stem}-{model_hash[:12]}-{scaler_hash[:12]}-{version}-*.parquet"))
+    if not candidates:
+        return None
+    path = min(candidates, key=lambda p: (not p.endswith("-all.parquet"), p))
+    return pd.read_parquet(path, filters=[("RegionName", "==", city)])
@@ -0,0 +1,167 @@
+import pandas as pd
+import numpy as np
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.base import clone
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.preprocessing import StandardScaler
+from feature_store import load_data
+from features import FEATURES, TARGET, add_interaction_features
+
+# -----------------------------
+# PATHS
+# -----------------------------
+cache_path = "./outputs/backtest_cache/"
+output_path = "./outputs/"
+
+
+# -----------------------------
+# SUPERVISED FRAME
+# -----------------------------
+# Features at month t, target = ZHVI `horizon` months later in the same region.
+# zhvi_all_homes_smoothed stays a (lagged) feature without leaking the target.
+# The target is matched by calendar month, not by row, so a region missing
+# month t + horizon gets no target instead of a later month's value.
+def make_supervised(data, horizon=1):
+    data = add_interaction_features(data.sort_values(["RegionID", "Date"], ignore_index=True))
+    month = data["Date"].dt.to_period("M")
+    future = pd.DataFrame({"RegionID": data["RegionID"], "month": month - horizon, "target": data[TARGET]})
+    data = data.assign(month=month).merge(future, on=["RegionID", "month"], how="left").drop(columns="month")
+    return data.dropna(subset=FEATURES + ["target"]).reset_index(drop=True)
+
+
+# -----------------------------
+# WALK-FORWARD FOLDS
+# -----------------------------
+# Expanding-window folds over months: fold k trains on every month up to its
+# cutoff (minus `horizon`, so training targets never fall in the test window)
+# and tests on the next `test_months` months.
+def build_folds(dates, n_folds=5, test_months=6, horizon=1):
+    months = np.sort(np.unique(dates))
+    folds = []
+    for k in range(n_folds):
+        test_start = len(months) - (n_folds - k) * test_months
+        train_end = test_start - horizon
+        if train_end <= 0:
+            continue
+        folds.append({
+            "fold": k,
+            "train_end": months[train_end - 1],
+            "test_start": months[test_start],
+            "test_end": months[min(test_start + test_months, len(months)) - 1],
+        })
+    return folds
+
+
+# Scale each fold on its own training rows and save the matrices as .npy
+# files, so every model (and every later run on the same data) memory-maps
+# them instead of re-scaling. The cache directory is keyed by a hash of the
+# data and fold settings.
+def cache_folds(supervised, folds, horizon, cache_dir=cache_path):
+    X = supervised[FEATURES].to_numpy(dtype="float64")
+    y = supervised["target"].to_numpy(dtype="float64")
+    dates = supervised["Date"].to_numpy()
+
+    digest = hashlib.sha1()
+    for arr in (X, y, dates.astype("int64")):
+        digest.update(np.ascontiguousarray(arr).tobytes())
+    digest.update(json.dumps([horizon, [str(f["test_start"]) for f in folds]]).encode())
+    root = os.path.join(cache_dir, digest.hexdigest()[:16])
+
+    paths = []
+    for fold in folds:
+        fold_dir = os.path.join(root, f"fold_{fold['fold']}")
+        paths.append(fold_dir)
+        if os.path.exists(os.path.join(fold_dir, "y_test.npy")):
+            continue
+
+        train = dates <= fold["train_end"]
+        test = (dates >= fold["test_start"]) & (dates <= fold["test_end"])
+        scaler = StandardScaler().fit(X[train])
+
+        os.makedirs(fold_dir, exist_ok=True)
+        np.save(os.path.join(fold_dir, "X_train.npy"), scaler.transform(X[train]))
+        np.save(os.path.join(fold_dir, "X_test.npy"), scaler.transform(X[test]))
+        np.save(os.path.join(fold_dir, "y_train.npy"), y[train])
+        # Written last: its presence marks the fold as complete
+        np.save(os.path.join(fold_dir, "y_test.npy"), y[test])
+    return paths
+
+
+# -----------------------------
+# FOLD x MODEL TASK
+# -----------------------------
+def run_fold(fold, fold_dir, name, model):
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=1)  # parallelism comes from running folds concurrently
+
+    X_train = np.load(os.path.join(fold_dir, "X_train.npy"), mmap_mode="r")
+    y_train = np.load(os.path.join(fold_dir, "y_train.npy"), mmap_mode="r")
+    X_test = np.load(os.path.join(fold_dir, "X_test.npy"), mmap_mode="r")
+    y_test = np.load(os.path.join(fold_dir, "y_test.npy"), mmap_mode="r")
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    preds = model.predict(X_test)
+
+    return {
+        "fold": fold["fold"],
+        "model": name,
+        "train_end": str(pd.Timestamp(fold["train_end"]).date()),
+        "test_start": str(pd.Timestamp(fold["test_start"]).date()),
+        "test_end": str(pd.Timestamp(fold["test_end"]).date()),
+        "n_train": len(y_train),
+        "n_test": len(y_test),
+        "MAE": mean_absolute_error(y_test, preds),
+        "RMSE": float(np.sqrt(mean_squared_error(y_test, preds))),
+        "R2": r2_score(y_test, preds),
+        "fit_seconds": fit_seconds,
+    }
+
+
+def backtest(data, models, n_folds=5, test_months=6, horizon=1, workers=1, cache_dir=cache_path):
+    supervised = make_supervised(data, horizon)
+    folds = build_folds(supervised["Date"].to_numpy(), n_folds, test_months, horizon)
+    fold_dirs = cache_folds(supervised, folds, horizon, cache_dir)
+
+    tasks = [(fold, fold_dir, name, clone(model))
+             for fold, fold_dir in zip(folds, fold_dirs)
+             for name, model in models.items()]
+
+    if workers <= 1:
+        rows = [run_fold(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            rows = list(pool.map(run_fold, *zip(*tasks)))
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    from model_training import models
+
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the model zoo.")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--test-months", type=int, default=6)
+    parser.add_argument("--horizon", type=int, default=1, help="months ahead to predict ZHVI")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--models", nargs="*", default=None, help="model files to include (default: all)")
+    args = parser.parse_args()
+
+    selected = {name: m for name, m in models.items() if not args.models or name in args.models}
+
+    print("🔄 Loading processed dataset...")
+    base_columns = ["RegionID", "Date"] + [c for c in FEATURES if c not in ("Housing_Market_Interaction", "Housing_Sales_Ratio")]
+    data = load_data(columns=base_columns)
+
+    print(f"🚀 Backtesting {len(selected)} model(s) over {args.folds} walk-forward folds...")
+    metrics = backtest(data, selected, args.folds, args.test_months, args.horizon, args.workers)
+
+    os.makedirs(output_path, exist_ok=True)
+    metrics.to_csv(os.path.join(output_path, "backtest_metrics.csv"), index=False)
+    print(metrics.groupby("model")[["MAE", "RMSE", "R2"]].mean().sort_values("MAE").to_string())
+    print(f"\n🎉 Per-fold metrics saved in {os.path.join(output_path, 'backtest_metrics.csv')}")
@@ -0,0 +1,128 @@
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from feature_store import iter_batches, load_data, store_path
+from features import FEATURES, add_interaction_features
+from model_registry import ModelRegistry
+from instrumentation import span
+from sequences import SequenceDataset, SEQUENCE_FEATURES, feature_scaling, forecast
+
+# -----------------------------
+# PATHS
+# -----------------------------
+model_path = "./Models/"
+output_path = "./outputs/predictions/"
+
+KEY_COLUMNS = ["RegionID", "RegionName", "Date"]
+
+# Model and scaler of the current process (loaded once per worker)
+_model = None
+_scaler = None
+
+
+def init_worker(models_dir, model_file):
+    global _model, _scaler
+    registry = ModelRegistry(models_dir, max_models=2)
+    _scaler = registry.get("scaler.pkl")
+    _model = registry.get(model_file)
+
+
+def score_chunk(chunk):
+    chunk = add_interaction_features(chunk).dropna(subset=FEATURES)
+    out = chunk[KEY_COLUMNS].copy()
+    out["RegionName"] = out["RegionName"].astype(str)
+    if len(chunk):
+        with span("predict", rows=len(chunk)):
+            X_scaled = _scaler.transform(chunk[FEATURES])
+            out["prediction"] = np.asarray(_model.predict(X_scaled), dtype="float64")
+    else:
+        out["prediction"] = pd.Series(dtype="float64")
+    return out
+
+
+PART_NAME = re.compile(r"part-\d{5}\.parquet$")
+
+
+# Remove the part files of an earlier run. Only directories holding nothing
+# but part files are cleared, so --output never deletes unrelated data.
+def clear_output(path):
+    if not os.path.isdir(path):
+        return
+    entries = os.listdir(path)
+    foreign = [name for name in entries if not PART_NAME.match(name)]
+    if foreign:
+        raise ValueError(f"{path} is not a prediction output directory (it contains {', '.join(sorted(foreign)[:3])})")
+    for name in entries:
+        os.remove(os.path.join(path, name))
+
+
+def write_part(out, part, model_file):
+    out["model"] = os.path.splitext(model_file)[0]
+    path = os.path.join(output_path, f"part-{part:05d}.parquet")
+    pq.write_table(pa.Table.from_pandas(out, preserve_index=False), path)
+    return len(out)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score the processed dataset with a trained model.")
+    parser.add_argument("--model", default="xgboost.pkl", help="model file in the models folder")
+    parser.add_argument("--models-dir", default=model_path)
+    parser.add_argument("--store", default=store_path)
+    parser.add_argument("--output", default=output_path)
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=1, help="processes to score chunks in parallel")
+    parser.add_argument("--steps", type=int, default=6, help="months ahead to forecast with an LSTM (.h5) model")
+    args = parser.parse_args()
+    output_path = args.output
+
+    try:
+        clear_output(output_path)
+    except ValueError as e:
+        parser.error(str(e))
+    os.makedirs(output_path, exist_ok=True)
+
+    columns = KEY_COLUMNS + [c for c in FEATURES if c not in ("Housing_Market_Interaction", "Housing_Sales_Ratio")]
+    chunks = iter_batches(columns=columns, batch_size=args.chunk_rows, path=args.store)
+
+    print(f"🚀 Scoring {args.store} with {args.model} ({args.workers} worker(s))...")
+    start = time.perf_counter()
+    total = 0
+
+    if args.model.endswith(".h5"):
+        # Sequence model: one batched recursive forecast over every metro
+        registry = ModelRegistry(args.models_dir, max_models=2)
+        data = load_data(columns=["RegionName", "Date"] + SEQUENCE_FEATURES, path=args.store)
+        dataset = SequenceDataset(data, scaling=feature_scaling(registry.get("scaler.pkl")))
+        with span("predict:lstm", rows=len(dataset.regions), steps=args.steps):
+            out = forecast(registry.get(args.model), dataset, steps=args.steps)
+        total = write_part(out, 0, args.model)
+        print(f"   ✔ Forecast {args.steps} month(s) for {out['RegionName'].nunique():,} metros")
+    else:
+        with span("predict:batch", model=args.model, workers=args.workers) as s:
+            if args.workers <= 1:
+                init_worker(args.models_dir, args.model)
+                for part, chunk in enumerate(chunks):
+                    total += write_part(score_chunk(chunk), part, args.model)
+            else:
+                # Keep at most two chunks per worker in flight so memory stays bounded
+                with ProcessPoolExecutor(args.workers, initializer=init_worker,
+                                         initargs=(args.models_dir, args.model)) as pool:
+                    pending = []
+                    for part, chunk in enumerate(chunks):
+                        pending.append((part, pool.submit(score_chunk, chunk)))
+                        if len(pending) >= 2 * args.workers:
+                            done_part, future = pending.pop(0)
+                            total += write_part(future.result(), done_part, args.model)
+                    for done_part, future in pending:
+                        total += write_part(future.result(), done_part, args.model)
+            s.rows = total
+
+    elapsed = time.perf_counter() - start
+    print(f"   ✔ Scored {total:,} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)")
+    print(f"🎉 Predictions written to {output_path}")
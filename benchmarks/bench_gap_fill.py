@@ -0,0 +1,73 @@
+import pandas as pd
+import numpy as np
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from gap_fill import fill_gaps
+
+# Compares the old global ffill/bfill (Step 5 of data_preprocessing.py) with the
+# per-region fill_gaps stage on the city housing starts join. The starts file is
+# expanded to the region x month grid of the Zillow panel it is joined onto, so
+# it has the same pre-2018 gaps as the merged frame.
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--path", default="./data/raw/city_level_housing_starts.csv")
+parser.add_argument("--history-start", default="2000-01-31",
+                    help="first month of the Zillow panel the starts file is joined onto")
+parser.add_argument("--max-gap", type=int, default=3)
+parser.add_argument("--repeat", type=int, default=3)
+args = parser.parse_args()
+
+print(f"Loading {args.path}...")
+starts = pd.read_csv(args.path)
+starts["Date"] = pd.to_datetime(starts["Date"])
+starts = starts.drop(columns=["date"], errors="ignore")
+
+months = pd.date_range(args.history_start, starts["Date"].max(), freq="ME")
+grid = pd.MultiIndex.from_product([starts["RegionID"].unique(), months], names=["RegionID", "Date"])
+panel = starts.set_index(["RegionID", "Date"]).reindex(grid).reset_index()
+columns = [c for c in panel.select_dtypes("number").columns if c not in ("RegionID", "SizeRank")]
+print(f"Panel: {len(panel):,} rows, {len(columns)} metric columns, "
+      f"{int(panel[columns].isna().sum().sum()):,} missing cells")
+
+
+def global_fill(df):
+    df = df.ffill()
+    return df.bfill()
+
+
+def group_fill(df):
+    return fill_gaps(df, columns, group_col="RegionID", max_gap=args.max_gap)
+
+
+def measure(fn):
+    times = []
+    for _ in range(args.repeat):
+        df = panel.copy()
+        start = time.perf_counter()
+        fn(df)
+        times.append(time.perf_counter() - start)
+
+    df = panel.copy()
+    tracemalloc.start()
+    out = fn(df)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak, out
+
+
+results = {}
+for name, fn in [("global ffill/bfill", global_fill), ("fill_gaps per region", group_fill)]:
+    seconds, peak, out = measure(fn)
+    results[name] = out
+    print(f"{name:<22} {seconds * 1000:9.1f} ms   peak {peak / 2**20:8.1f} MiB")
+
+# Leading gaps in a region are forward-filled from the previous region's rows
+ordered = panel.sort_values(["RegionID", "Date"])
+leading = ordered[columns].notna().groupby(ordered["RegionID"]).cumsum() == 0
+leaked = leading & results["global ffill/bfill"].loc[ordered.index, columns].notna()
+print(f"Cells the global path filled across region boundaries: {int(leaked.to_numpy().sum()):,}")
@@ -0,0 +1,234 @@
+import pandas as pd
+import numpy as np
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, REPO)
+from data_preprocessing import file_paths
+
+# End-to-end benchmark of preprocessing -> training -> SHAP -> dashboard
+# predict on synthetic Zillow-shaped wide CSVs. Every stage runs the real
+# script as a child process inside a scratch workspace, so wall time and
+# peak RSS are per stage. Results are appended to a JSON history and
+# compared against a saved baseline of the same scale. Runs offline, on CPU.
+
+# Metrics the model features depend on are always generated first
+REQUIRED_METRICS = [
+    "new_construction_sales_all_homes",
+    "market_heat_index",
+    "percent_sold_above_list_all_homes",
+    "percent_sold_below_list_all_homes",
+    "sales_count_nowcast",
+    "total_transaction_value_all_homes",
+    "zhvi_all_homes_smoothed",
+]
+STAGES = ["preprocess", "train", "shap", "predict"]
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--metros", type=int, default=200)
+parser.add_argument("--months", type=int, default=120)
+parser.add_argument("--metrics", type=int, default=len(file_paths),
+                    help=f"wide files to generate ({len(REQUIRED_METRICS)}-{len(file_paths)})")
+parser.add_argument("--missing", type=float, default=0.1, help="fraction of missing cells per file")
+parser.add_argument("--seed", type=int, default=0)
+parser.add_argument("--stages", nargs="*", default=STAGES, choices=STAGES)
+parser.add_argument("--shap-per-stratum", type=int, default=5)
+parser.add_argument("--predict-calls", type=int, default=200)
+parser.add_argument("--workdir", default=None, help="scratch workspace (default: a temporary directory)")
+parser.add_argument("--history", default="./outputs/benchmarks/history.json")
+parser.add_argument("--baseline", default="./outputs/benchmarks/baseline.json")
+parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+parser.add_argument("--tolerance", type=float, default=0.2,
+                    help="allowed slowdown / RSS growth over the baseline before a stage is flagged")
+args = parser.parse_args()
+
+
+# -----------------------------
+# SYNTHETIC DATA
+# -----------------------------
+# Wide files with the Zillow layout (5 region keys + one column per month):
+# each metric is a per-metro level following a random walk, with a share of
+# cells missing. The housing starts file covers every metro and month.
+def generate(workdir, metros, months, n_metrics, missing, seed):
+    rng = np.random.default_rng(seed)
+    raw = os.path.join(workdir, "data", "raw")
+    os.makedirs(raw, exist_ok=True)
+
+    states = np.array(["CA", "TX", "NY", "FL", "GA", "WA", "IL", "OH", "NC", "AZ"])
+    regions = pd.DataFrame({
+        "RegionID": np.arange(100_000, 100_000 + metros),
+        "SizeRank": np.arange(metros),
+        "RegionName": [f"Metro {i}, {states[i % len(states)]}" for i in range(metros)],
+        "RegionType": "msa",
+        "StateName": states[np.arange(metros) % len(states)],
+    })
+    dates = pd.date_range("2000-01-31", periods=months, freq="ME")
+    labels = dates.strftime("%Y-%m-%d")
+
+    names = REQUIRED_METRICS + [n for n in file_paths if n not in REQUIRED_METRICS]
+    for name in names[:max(n_metrics, len(REQUIRED_METRICS))]:
+        level = rng.uniform(50, 500, size=(metros, 1))
+        values = level * np.exp(np.cumsum(rng.normal(0, 0.01, size=(metros, months)), axis=1))
+        values[rng.random(values.shape) < missing] = np.nan
+        wide = pd.concat([regions, pd.DataFrame(values, columns=labels)], axis=1)
+        wide.to_csv(os.path.join(raw, os.path.basename(file_paths[name])), index=False)
+
+    starts = regions.loc[np.repeat(np.arange(metros), months)].reset_index(drop=True)
+    starts["Date"] = np.tile(labels, metros)
+    starts["City_Housing_Starts"] = rng.gamma(2.0, 200.0, size=len(starts)).round(1)
+    starts.to_csv(os.path.join(raw, "city_level_housing_starts.csv"), index=False)
+
+    # model_training.py saves to ./Models/ and reloads from ./models/
+    os.makedirs(os.path.join(workdir, "Models"), exist_ok=True)
+    if not os.path.exists(os.path.join(workdir, "models")):
+        os.symlink("Models", os.path.join(workdir, "models"))
+    return metros * months
+
+
+# One dashboard interaction: look up a city and score baseline + scenario
+PREDICT_CODE = """
+import sys, time
+from feature_store import load_data
+from model_registry import ModelRegistry
+from features import FEATURES
+from city_index import CityIndex
+from scenarios import score_scenarios
+calls = int(sys.argv[1])
+index = CityIndex(load_data(columns=["RegionName", "Date"] + FEATURES), FEATURES)
+registry = ModelRegistry("./Models/")
+scaler, model = registry.get("scaler.pkl"), registry.get("xgboost.pkl")
+start = time.perf_counter()
+for i in range(calls):
+    dates, X = index.get(index.cities[i % len(index)])
+    score_scenarios(model, scaler, X, [0, 100])
+print(f"calls_seconds={time.perf_counter() - start}")
+"""
+
+
+# -----------------------------
+# STAGE RUNNER
+# -----------------------------
+# Run one stage as a child process, logging its output to <stage>.log.
+# wait4 reports the peak RSS of that child (and the workers it waited for).
+def run_stage(stage, command, workdir):
+    env = dict(os.environ, PYTHONPATH=REPO, CUDA_VISIBLE_DEVICES="", MPLBACKEND="Agg")
+    log_path = os.path.join(workdir, f"{stage}.log")
+    with open(log_path, "w") as log:
+        start = time.perf_counter()
+        proc = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+        seconds = time.perf_counter() - start
+    with open(log_path) as f:
+        output = f.read()
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(f"{stage} stage failed:\n{output[-2000:]}")
+    return seconds, usage.ru_maxrss / 1024, output  # KiB -> MiB on Linux
+
+
+def stage_command(stage):
+    script = {
+        "preprocess": ["data_preprocessing.py"],
+        "train": ["model_training.py"],
+        "shap": ["shap_analysis.py", "--per-stratum", str(args.shap_per_stratum), "--workers", "1"],
+    }
+    if stage == "predict":
+        return [sys.executable, "-c", PREDICT_CODE, str(args.predict_calls)]
+    name, *rest = script[stage]
+    return [sys.executable, os.path.join(REPO, name)] + rest
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+scale = {"metros": args.metros, "months": args.months, "metrics": max(args.metrics, len(REQUIRED_METRICS)),
+         "missing": args.missing, "seed": args.seed}
+workdir = args.workdir or tempfile.mkdtemp(prefix="bench_pipeline_")
+print(f"Generating {scale['metros']} metros x {scale['months']} months x {scale['metrics']} metrics in {workdir}...")
+panel_rows = generate(workdir, args.metros, args.months, args.metrics, args.missing, args.seed)
+
+results = {}
+for stage in [s for s in STAGES if s in args.stages]:
+    seconds, rss, output = run_stage(stage, stage_command(stage), workdir)
+    if stage == "predict":
+        # Throughput of the calls themselves, without imports and model loading
+        units, unit = args.predict_calls, "calls"
+        busy = float(output.rsplit("calls_seconds=", 1)[1].split()[0])
+    else:
+        units, unit, busy = panel_rows, "panel rows", seconds
+    results[stage] = {
+        "wall_s": round(seconds, 4),
+        "peak_rss_mb": round(rss, 1),
+        "units": units,
+        "unit": unit,
+        "throughput_per_s": round(units / busy, 2),
+    }
+    print(f"{stage:<11} {seconds:9.2f} s   peak RSS {rss:8.1f} MiB   {units / busy:12,.1f} {unit}/s")
+
+run = {
+    "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+    "commit": git_commit(),
+    "python": platform.python_version(),
+    "machine": platform.machine(),
+    "cpu_count": os.cpu_count(),
+    "scale": scale,
+    "stages": results,
+}
+
+
+# -----------------------------
+# REGRESSION CHECK
+# -----------------------------
+regressions = []
+if os.path.exists(args.baseline):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["scale"] != scale:
+        print(f"Baseline in {args.baseline} was recorded at a different scale; skipping comparison")
+    else:
+        for stage, current in results.items():
+            before = baseline["stages"].get(stage)
+            if before is None:
+                continue
+            for key in ["wall_s", "peak_rss_mb"]:
+                ratio = current[key] / before[key] if before[key] else 1.0
+                if ratio > 1 + args.tolerance:
+                    regressions.append(f"{stage} {key}: {before[key]} -> {current[key]} ({ratio - 1:+.0%})")
+run["regressions"] = regressions
+
+history = []
+if os.path.exists(args.history):
+    with open(args.history) as f:
+        history = json.load(f)
+history.append(run)
+os.makedirs(os.path.dirname(os.path.abspath(args.history)), exist_ok=True)
+with open(args.history, "w") as f:
+    json.dump(history, f, indent=4)
+print(f"Run appended to {args.history} ({len(history)} runs)")
+
+if args.workdir is None:
+    shutil.rmtree(workdir, ignore_errors=True)
+
+if args.save_baseline:
+    os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+    with open(args.baseline, "w") as f:
+        json.dump(run, f, indent=4)
+    print(f"Baseline saved to {args.baseline}")
+
+if regressions:
+    print("Regressions against the baseline:")
+    for line in regressions:
+        print(f"  {line}")
+    sys.exit(1)
@@ -0,0 +1,79 @@
+import numpy as np
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Cold-start benchmark of the dashboard. Every run is a fresh Python process
+# that renders app.py once (streamlit's AppTest, no browser) from the
+# workspace, so nothing is cached or already imported. The app logs its own
+# time to first render (first script run start -> first chart) to
+# outputs/dashboard_timing.json; this script collects it together with the
+# child's total wall time and fails when the median exceeds the target.
+#
+#   python serving_snapshot.py
+#   python benchmarks/cold_start.py --runs 5 --target-seconds 1.5 --compare
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--runs", type=int, default=5)
+parser.add_argument("--target-seconds", type=float, default=1.5, help="allowed median time to first render")
+parser.add_argument("--workdir", default=".", help="folder with data/, Models/ and style.css")
+parser.add_argument("--compare", action="store_true", help="also measure without the serving snapshot")
+parser.add_argument("--output", default="./outputs/benchmarks/cold_start.json")
+args = parser.parse_args()
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=600).run()
+total = time.perf_counter() - start
+with open("outputs/dashboard_timing.json") as f:
+    timing = json.load(f)[-1]
+print(json.dumps(dict(timing, run_s=round(total, 3), exceptions=len(at.exception))))
+"""
+
+
+def measure(env):
+    result = subprocess.run([sys.executable, "-c", CHILD, os.path.join(REPO, "app.py")], cwd=args.workdir, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_case(name, env):
+    rows = [measure(env) for _ in range(args.runs)]
+    first = np.array([row["first_render_s"] for row in rows])
+    total = np.array([row["run_s"] for row in rows])
+    summary = {
+        "case": name,
+        "data_source": rows[-1]["data_source"],
+        "first_render_median_s": round(float(np.median(first)), 3),
+        "first_render_max_s": round(float(first.max()), 3),
+        "run_median_s": round(float(np.median(total)), 3),
+        "heavy_modules_at_first_render": rows[-1]["heavy_modules"],
+        "exceptions": sum(row["exceptions"] for row in rows),
+    }
+    print(f"   ✔ {name:<12} first render median {summary['first_render_median_s']:.2f}s "
+          f"(max {summary['first_render_max_s']:.2f}s), full run {summary['run_median_s']:.2f}s, "
+          f"from {summary['data_source']}, loaded: {', '.join(summary['heavy_modules_at_first_render']) or 'none'}")
+    return summary
+
+
+os.makedirs(os.path.join(args.workdir, "outputs"), exist_ok=True)
+print(f"🚀 Measuring dashboard cold start over {args.runs} fresh process(es)...")
+results = [run_case("default", dict(os.environ))]
+if args.compare:
+    results.append(run_case("no snapshot", dict(os.environ, DASHBOARD_SNAPSHOT=os.path.join(args.workdir, "no-such-snapshot"))))
+
+os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+with open(args.output, "w") as f:
+    json.dump({"target_seconds": args.target_seconds, "results": results}, f, indent=4)
+
+median = results[0]["first_render_median_s"]
+if median > args.target_seconds:
+    print(f"\n⚠️ Median first render {median:.2f}s is over the {args.target_seconds:.2f}s target")
+    sys.exit(1)
+print(f"\n🎉 Median first render {median:.2f}s is within the {args.target_seconds:.2f}s target")
@@ -0,0 +1,131 @@
+import numpy as np
+import argparse
+import asyncio
+import json
+import time
+
+# Load test for prediction_service.py on localhost. `--concurrency` clients
+# each hold one keep-alive connection and send /predict requests back to back
+# for random cities until `--requests` have been sent in total. Reports
+# client-side throughput and latency, then the server's own /metrics (batch
+# sizes, queue wait, batch predict time).
+#
+#   python prediction_service.py --port 8080 &
+#   python benchmarks/load_test.py --port 8080 --concurrency 64 --requests 5000
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--host", default="127.0.0.1")
+parser.add_argument("--port", type=int, default=8080)
+parser.add_argument("--concurrency", type=int, default=32)
+parser.add_argument("--requests", type=int, default=2000)
+parser.add_argument("--model", default="xgboost.pkl")
+parser.add_argument("--extra-units", type=float, nargs="*", default=[0, 100])
+parser.add_argument("--last", type=int, default=12, help="months returned per request (0 = full history)")
+parser.add_argument("--seed", type=int, default=0)
+parser.add_argument("--output", default=None, help="also write the results to this JSON file")
+args = parser.parse_args()
+
+
+# -----------------------------
+# HTTP CLIENT
+# -----------------------------
+class Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host, port):
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def request(self, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {args.host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            header = await self.reader.readline()
+            if header in (b"\r\n", b""):
+                break
+            name, _, value = header.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    def close(self):
+        self.writer.close()
+
+
+# -----------------------------
+# LOAD
+# -----------------------------
+async def client(cities, counter, latencies, errors, rng):
+    conn = await Connection.open(args.host, args.port)
+    try:
+        while counter[0] < args.requests:
+            counter[0] += 1
+            payload = {"city": cities[rng.integers(len(cities))], "model": args.model, "extra_units": args.extra_units}
+            if args.last:
+                payload["last"] = args.last
+            start = time.perf_counter()
+            status, _ = await conn.request("POST", "/predict", payload)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status != 200:
+                errors.append(status)
+    finally:
+        conn.close()
+
+
+async def main():
+    conn = await Connection.open(args.host, args.port)
+    _, body = await conn.request("GET", "/cities")
+    cities = body["cities"]
+    print(f"🚀 {args.requests:,} requests, {args.concurrency} concurrent, {len(cities)} cities, model {args.model}")
+
+    # One warm-up request so model loading is not counted
+    await conn.request("POST", "/predict", {"city": cities[0], "model": args.model})
+    _, before = await conn.request("GET", "/metrics")
+
+    counter, latencies, errors = [0], [], []
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        client(cities, counter, latencies, errors, np.random.default_rng(args.seed + i))
+        for i in range(args.concurrency)
+    ])
+    seconds = time.perf_counter() - start
+
+    _, after = await conn.request("GET", "/metrics")
+    conn.close()
+
+    lat = np.asarray(latencies)
+    batches = after["batches"] - before["batches"]
+    batch_requests = after["requests"] - before["requests"]
+    result = {
+        "requests": len(lat),
+        "errors": len(errors),
+        "concurrency": args.concurrency,
+        "seconds": round(seconds, 3),
+        "requests_per_s": round(len(lat) / seconds, 1),
+        "latency_ms": {f"p{q}": round(float(np.percentile(lat, q)), 2) for q in (50, 95, 99)} | {"max": round(float(lat.max()), 2)},
+        "server_batches": batches,
+        "server_requests_per_batch": round(batch_requests / batches, 2) if batches else None,
+        "server": after,
+    }
+
+    print(f"   ✔ {result['requests_per_s']:,.1f} req/s over {seconds:.2f}s, {len(errors)} errors")
+    print(f"   ✔ latency p50 {result['latency_ms']['p50']} ms, p95 {result['latency_ms']['p95']} ms, "
+          f"p99 {result['latency_ms']['p99']} ms")
+    print(f"   ✔ {batches} batches, {result['server_requests_per_batch']} requests per batch, "
+          f"server queue wait p95 {after['queue_wait_ms']['p95']} ms, batch predict p95 {after['batch_predict_ms']['p95']} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=4)
+        print(f"📁 Results written to {args.output}")
+
+
+asyncio.run(main())
@@ -0,0 +1,44 @@
+import pandas as pd
+import numpy as np
+from features import FEATURES, add_interaction_features
+
+
+# -----------------------------
+# CITY INDEX
+# -----------------------------
+# The processed panel grouped once by region: rows are sorted by (region, date)
+# into one contiguous feature matrix, and each region maps to its row range.
+# Looking up a city is a dict access returning views, not a full-table filter.
+class CityIndex:
+    def __init__(self, data, features=FEATURES, key="RegionName", date_col="Date"):
+        # Rows left missing by the bounded gap fill cannot be scored
+        data = add_interaction_features(data.copy()).dropna(subset=list(features))
+        codes, names = pd.factorize(data[key].astype(str), sort=True)
+        dates = pd.to_datetime(data[date_col]).to_numpy()
+        order = np.lexsort((dates, codes))
+
+        self.features = list(features)
+        self.cities = list(names)
+        self.dates = dates[order]
+        # float32 when every feature column is (see CompactPanel), else float64
+        dtype = np.result_type("float32", *data[self.features].dtypes)
+        self.matrix = np.ascontiguousarray(data[self.features].to_numpy(dtype=dtype)[order])
+
+        bounds = np.searchsorted(codes[order], np.arange(len(names) + 1))
+        self._rows = {
+            name: slice(int(bounds[i]), int(bounds[i + 1])) for i, name in enumerate(self.cities)
+        }
+
+    def __len__(self):
+        return len(self.cities)
+
+    def __contains__(self, city):
+        return city in self._rows
+
+    def rows(self, city):
+        return self._rows[city]
+
+    # (dates, feature matrix) for one city
+    def get(self, city):
+        rows = self._rows[city]
+        return self.dates[rows], self.matrix[rows]
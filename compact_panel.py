@@ -0,0 +1,109 @@
+import pandas as pd
+import numpy as np
+from ingestion import ID_VARS
+
+
+# -----------------------------
+# PRECISION CHECK
+# -----------------------------
+# Round-trip one float64 column through float32. Integer-valued columns
+# (counts, sales) must come back exactly; other columns may move by at most
+# `rtol` relative to each value.
+def check_float32(values, rtol=1e-6):
+    finite = np.isfinite(values)
+    original = values[finite]
+    with np.errstate(over="ignore"):
+        restored = original.astype("float32").astype("float64")
+
+    abs_error = np.abs(restored - original)
+    rel_error = abs_error / np.maximum(np.abs(original), np.finfo("float64").tiny)
+    integral = bool(np.all(original == np.round(original)))
+
+    if not np.all(np.isfinite(restored)):
+        ok = False
+    elif integral:
+        ok = bool(np.all(abs_error == 0))
+    else:
+        ok = bool(len(original) == 0 or rel_error.max() <= rtol)
+
+    return {
+        "max_abs_error": float(abs_error.max()) if len(original) else 0.0,
+        "max_rel_error": float(rel_error.max()) if len(original) else 0.0,
+        "changed_values": int(np.count_nonzero(abs_error)),
+        "integer_valued": integral,
+        "downcast": ok,
+    }
+
+
+# -----------------------------
+# COMPACT PANEL
+# -----------------------------
+# The processed (region, month) panel with the region keys held once in a
+# dimension table: each row carries an int32 `region` code instead of the
+# RegionName / RegionType / StateName strings, and metric columns are float32
+# wherever check_float32 allows. `report` lists every metric column with the
+# precision it would lose and whether it was downcast.
+class CompactPanel:
+    def __init__(self, regions, rows, report):
+        self.regions = regions
+        self.rows = rows
+        self.report = report
+
+    @classmethod
+    def from_frame(cls, df, rtol=1e-6, region_columns=ID_VARS):
+        region_columns = [c for c in region_columns if c in df.columns]
+        if region_columns:
+            keys = df[region_columns]
+            codes = keys.groupby(region_columns, dropna=False, sort=False, observed=True).ngroup().to_numpy()
+            _, first = np.unique(codes, return_index=True)
+            regions = keys.iloc[first].reset_index(drop=True)
+            for col in regions.columns:
+                if isinstance(regions[col].dtype, pd.CategoricalDtype):
+                    regions[col] = regions[col].astype(object)
+            rows = pd.DataFrame({"region": codes.astype("int32")})
+        else:
+            regions = pd.DataFrame()
+            rows = pd.DataFrame(index=range(len(df)))
+
+        report = []
+        for col in df.columns:
+            if col in region_columns:
+                continue
+            values = df[col]
+            if pd.api.types.is_float_dtype(values.dtype):
+                array = values.to_numpy(dtype="float64")
+                check = check_float32(array, rtol)
+                rows[col] = array.astype("float32") if check["downcast"] else array
+                report.append({"column": col, **check, "dtype": str(rows[col].dtype)})
+            else:
+                rows[col] = values.to_numpy()
+        return cls(regions, rows, pd.DataFrame(report))
+
+    # Expand back into one flat frame (region columns as categoricals)
+    def to_frame(self, columns=None):
+        columns = list(columns) if columns is not None else list(self.regions.columns) + [
+            c for c in self.rows.columns if c != "region"
+        ]
+        codes = self.rows["region"].to_numpy() if "region" in self.rows.columns else None
+        out = {}
+        for col in columns:
+            if col in self.regions.columns:
+                values = self.regions[col]
+                if pd.api.types.is_integer_dtype(values.dtype):
+                    out[col] = values.to_numpy(dtype="int32")[codes]
+                else:
+                    categories, uniques = pd.factorize(values, use_na_sentinel=True)
+                    out[col] = pd.Categorical.from_codes(categories[codes], uniques)
+            else:
+                out[col] = self.rows[col].to_numpy()
+        return pd.DataFrame(out, columns=columns)
+
+    def memory_usage(self):
+        return int(self.regions.memory_usage(deep=True).sum() + self.rows.memory_usage(deep=True).sum())
+
+    def __len__(self):
+        return len(self.rows)
+
+
+def frame_memory(df):
+    return int(df.memory_usage(deep=True).sum())
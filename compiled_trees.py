@@ -0,0 +1,209 @@
+import numpy as np
+import json
+import os
+
+# -----------------------------
+# FLAT TREE FORMAT
+# -----------------------------
+# Every tree of an ensemble is packed into shared contiguous buffers:
+#   feature[i]   split feature of node i (-1 for leaves)
+#   threshold[i] split threshold
+#   left[i], right[i]  child node indices (global)
+#   default_left[i]    where missing (NaN) values go
+#   value[i]     leaf value
+#   roots[t]     root node of tree t
+# and meta.json holds how leaves combine into a prediction:
+#   prediction = base + scale * aggregate(leaf values over trees)
+ARRAYS = ["feature", "threshold", "left", "right", "default_left", "value", "roots"]
+
+
+def _pack(trees):
+    offsets = np.cumsum([0] + [len(t["feature"]) for t in trees])
+    packed = {}
+    for name, dtype in [("feature", "int32"), ("threshold", "float64"), ("default_left", bool), ("value", "float64")]:
+        packed[name] = np.concatenate([t[name] for t in trees]).astype(dtype)
+    # Child indices become global by offsetting each tree's local indices
+    for name in ["left", "right"]:
+        packed[name] = np.concatenate(
+            [np.where(t[name] >= 0, t[name] + offset, -1) for t, offset in zip(trees, offsets)]
+        ).astype("int32")
+    packed["roots"] = offsets[:-1].astype("int32")
+    return packed
+
+
+def _sklearn_tree(tree):
+    t = tree.tree_
+    leaf = t.children_left < 0
+    default_left = getattr(t, "missing_go_to_left", np.ones(t.node_count, dtype=bool))
+    return {
+        "feature": np.where(leaf, -1, t.feature),
+        "threshold": t.threshold,
+        "left": t.children_left,
+        "right": t.children_right,
+        "default_left": np.asarray(default_left, dtype=bool),
+        "value": t.value[:, 0, 0],
+    }
+
+
+def _xgboost_trees(model):
+    booster = model.get_booster()
+    raw = json.loads(booster.save_raw(raw_format="json"))
+    learner = raw["learner"]
+    base_score = float(str(learner["learner_model_param"]["base_score"]).strip("[]"))
+
+    trees = []
+    for tree in learner["gradient_booster"]["model"]["trees"]:
+        left = np.asarray(tree["left_children"])
+        leaf = left < 0
+        conditions = np.asarray(tree["split_conditions"], dtype="float32").astype("float64")
+        trees.append({
+            "feature": np.where(leaf, -1, np.asarray(tree["split_indices"])),
+            "threshold": np.where(leaf, 0.0, conditions),
+            "left": left,
+            "right": np.asarray(tree["right_children"]),
+            "default_left": np.asarray(tree["default_left"], dtype=bool),
+            "value": np.where(leaf, conditions, 0.0),
+        })
+    return trees, base_score
+
+
+def _lightgbm_trees(booster):
+    dump = booster.dump_model()
+    trees = []
+    for info in dump["tree_info"]:
+        nodes = []
+
+        # Depth-first flattening of the nested tree_structure
+        def visit(node):
+            index = len(nodes)
+            nodes.append(None)
+            if "leaf_value" in node:
+                nodes[index] = (-1, 0.0, -1, -1, True, node["leaf_value"])
+            else:
+                if node.get("decision_type", "<=") != "<=":
+                    raise ValueError("Categorical LightGBM splits are not supported")
+                # missing_type "NaN" sends NaN to default_left; "None" scores NaN
+                # as 0, i.e. left iff 0 <= threshold. "Zero" also routes 0 to the
+                # default side, which the flat format cannot express.
+                missing_type = node.get("missing_type", "NaN")
+                if missing_type == "Zero":
+                    raise ValueError("LightGBM splits with missing_type Zero are not supported")
+                default_left = node.get("default_left", True) if missing_type == "NaN" else node["threshold"] >= 0
+                left = visit(node["left_child"])
+                right = visit(node["right_child"])
+                nodes[index] = (node["split_feature"], node["threshold"], left, right, default_left, 0.0)
+            return index
+
+        visit(info["tree_structure"])
+        columns = list(zip(*nodes))
+        trees.append({
+            "feature": np.asarray(columns[0]),
+            "threshold": np.asarray(columns[1], dtype="float64"),
+            "left": np.asarray(columns[2]),
+            "right": np.asarray(columns[3]),
+            "default_left": np.asarray(columns[4], dtype=bool),
+            "value": np.asarray(columns[5], dtype="float64"),
+        })
+    return trees
+
+
+# -----------------------------
+# EXPORT
+# -----------------------------
+# Flatten a fitted tree model into (arrays, meta). Raises TypeError for models
+# that are not tree ensembles (linear / lasso) and ValueError for LightGBM
+# splits the flat format cannot reproduce.
+def compile_model(model):
+    kind = type(model).__name__
+    if kind == "Booster" and type(model).__module__.startswith("lightgbm"):
+        kind = "LightGBMBooster"  # saved bare by out_of_core_training.py
+    n_features = model.num_feature() if kind == "LightGBMBooster" else model.n_features_in_
+    meta = {"kind": kind, "n_features": int(n_features), "base": 0.0, "scale": 1.0,
+            "aggregate": "sum", "compare": "<=", "float32_input": True}
+
+    if kind == "DecisionTreeRegressor":
+        trees = [_sklearn_tree(model)]
+    elif kind == "RandomForestRegressor":
+        trees = [_sklearn_tree(est) for est in model.estimators_]
+        meta["aggregate"] = "mean"
+    elif kind == "GradientBoostingRegressor":
+        trees = [_sklearn_tree(est) for est in model.estimators_[:, 0]]
+        init = model.init_
+        meta["base"] = 0.0 if init == "zero" else float(np.ravel(init.constant_)[0])
+        meta["scale"] = float(model.learning_rate)
+    elif kind == "XGBRegressor":
+        trees, meta["base"] = _xgboost_trees(model)
+        meta["compare"] = "<"
+    elif kind in ("LGBMRegressor", "LightGBMBooster"):
+        trees = _lightgbm_trees(model.booster_ if kind == "LGBMRegressor" else model)
+        meta["float32_input"] = False
+    else:
+        raise TypeError(f"{kind} is not a supported tree ensemble")
+
+    arrays = _pack(trees)
+    meta["n_trees"] = len(arrays["roots"])
+    meta["n_nodes"] = len(arrays["feature"])
+    return arrays, meta
+
+
+def save_compiled(arrays, meta, directory):
+    os.makedirs(directory, exist_ok=True)
+    for name in ARRAYS:
+        np.save(os.path.join(directory, f"{name}.npy"), arrays[name])
+    with open(os.path.join(directory, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=4)
+
+
+def read_meta(directory):
+    with open(os.path.join(directory, "meta.json")) as f:
+        return json.load(f)
+
+
+# -----------------------------
+# EVALUATOR
+# -----------------------------
+# Vectorized inference over the flat arrays: every (row, tree) pair advances
+# one level per step until all of them sit on a leaf.
+class CompiledEnsemble:
+    def __init__(self, arrays, meta):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.meta = meta
+        self.n_features_in_ = meta["n_features"]
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None)
+                  for name in ARRAYS}
+        return cls(arrays, read_meta(directory))
+
+    def _leaf_values(self, X):
+        n_rows = len(X)
+        rows = np.arange(n_rows)[:, None]
+        node = np.broadcast_to(self.roots, (n_rows, len(self.roots))).copy()
+        strict = self.meta["compare"] == "<"
+
+        while True:
+            feature = self.feature[node]
+            active = feature >= 0
+            if not active.any():
+                break
+            x = X[rows, np.maximum(feature, 0)]
+            threshold = self.threshold[node]
+            go_left = (x < threshold) if strict else (x <= threshold)
+            go_left = np.where(np.isnan(x), self.default_left[node], go_left)
+            child = np.where(go_left, self.left[node], self.right[node])
+            node = np.where(active, child, node)
+        return self.value[node]
+
+    def predict(self, X, chunk_rows=10_000):
+        X = np.asarray(X, dtype="float64")
+        if self.meta["float32_input"]:
+            X = X.astype("float32").astype("float64")
+
+        out = np.empty(len(X))
+        for start in range(0, len(X), chunk_rows):
+            leaves = self._leaf_values(X[start:start + chunk_rows])
+            combined = leaves.mean(axis=1) if self.meta["aggregate"] == "mean" else leaves.sum(axis=1)
+            out[start:start + chunk_rows] = self.meta["base"] + self.meta["scale"] * combined
+        return out
@@ -1,102 +1,183 @@
-import pandas as pd
-import os
-
-# Paths
-raw_data_path = "./data/raw/"
-processed_data_path = "./data/processed/processed_data.csv"
-city_housing_starts_path = "./data/raw/city_level_housing_starts.csv"
-updated_data_path = "./data/processed/updated_processed_data.csv"
-
-# File paths for all datasets
-file_paths = {
-    "new_construction_sales_all_homes": os.path.join(raw_data_path, "new_construction_sales_all_homes_monthly.csv"),
-    "new_construction_sales_condo_coop": os.path.join(raw_data_path, "new_construction_sales_condo_coop_monthly.csv"),
-    "new_construction_sales_sfr": os.path.join(raw_data_path, "new_construction_sales_sfr_monthly.csv"),
-    "median_sale_price_all_homes": os.path.join(raw_data_path, "median_sale_price_all_homes_monthly.csv"),
-    "median_list_price_all_homes": os.path.join(raw_data_path, "median_list_price_all_homes_monthly.csv"),
-    "market_heat_index": os.path.join(raw_data_path, "market_heat_index_all_homes_monthly.csv"),
-    "percent_sold_above_list_all_homes": os.path.join(raw_data_path, "percent_sold_above_list_all_homes_monthly.csv"),
-    "percent_sold_below_list_all_homes": os.path.join(raw_data_path, "percent_sold_below_list_all_homes_monthly.csv"),
-    "sales_count_nowcast": os.path.join(raw_data_path, "sales_count_nowcast_all_homes_monthly.csv"),
-    "total_transaction_value_all_homes": os.path.join(raw_data_path, "total_transaction_value_all_homes_monthly.csv"),
-    "zhvi_all_homes_smoothed": os.path.join(raw_data_path, "zhvi_all_homes_smoothed.csv"),
-    "zhvi_condo_coop": os.path.join(raw_data_path, "zhvi_condo_coop.csv"),
-    "zhvi_single_family_homes": os.path.join(raw_data_path, "zhvi_single_family_homes.csv"),
-    "median_days_to_pending_all_homes": os.path.join(raw_data_path, "median_days_to_pending_all_homes_monthly.csv"),
-    "median_days_to_close_all_homes": os.path.join(raw_data_path, "median_days_to_close_all_homes_monthly.csv"),
-}
-
-# Helper function to reshape datasets from wide to long format
-def reshape_wide_to_long(df, id_vars, value_name):
-    value_vars = [col for col in df.columns if col not in id_vars]
-    df_long = pd.melt(df, id_vars=id_vars, value_vars=value_vars, var_name="Date", value_name=value_name)
-    df_long["Date"] = pd.to_datetime(df_long["Date"], errors="coerce")
-    return df_long
-
-# Step 1: Load and reshape datasets
-datasets = {}
-for name, path in file_paths.items():
-    if os.path.exists(path):
-        print(f"Processing dataset: {name}")
-        df = pd.read_csv(path)
-        
-        # Ensure all required keys are present
-        required_keys = ["RegionID", "SizeRank", "RegionName", "RegionType", "StateName"]
-        for key in required_keys:
-            if key not in df.columns:
-                df[key] = None  # Add missing keys with default None
-        
-        reshaped_df = reshape_wide_to_long(df, required_keys, value_name=name)
-        datasets[name] = reshaped_df
-    else:
-        print(f"File not found: {path}")
-
-# Step 2: Merge all reshaped datasets
-print("Merging datasets...")
-merged_data = None
-for name, df in datasets.items():
-    if merged_data is None:
-        merged_data = df
-    else:
-        merged_data = pd.merge(
-            merged_data,
-            df,
-            on=["RegionID", "SizeRank", "RegionName", "RegionType", "StateName", "Date"],
-            how="outer"
-        )
-
-# Step 3: Load City Housing Starts and merge
-print("Loading City Housing Starts data...")
-city_housing_starts = pd.read_csv(city_housing_starts_path)
-
-# Standardize RegionName and convert Date columns
-print("Standardizing RegionName and Date formats...")
-merged_data['RegionName'] = merged_data['RegionName'].str.strip().str.lower()
-city_housing_starts['RegionName'] = city_housing_starts['RegionName'].str.strip().str.lower()
-merged_data['Date'] = pd.to_datetime(merged_data['Date'])
-city_housing_starts['Date'] = pd.to_datetime(city_housing_starts['Date'])
-
-# Merge City_Housing_Starts into merged_data
-merged_data = pd.merge(
-    merged_data,
-    city_housing_starts[['RegionID', 'SizeRank', 'RegionName', 'RegionType', 'StateName', 'Date', 'City_Housing_Starts']],
-    on=['RegionID', 'SizeRank', 'RegionName', 'RegionType', 'StateName', 'Date'],
-    how='left'
-)
-
-# Step 4: Add interaction features
-print("Adding interaction features...")
-merged_data["Housing_Market_Interaction"] = merged_data["City_Housing_Starts"] * merged_data["market_heat_index"]
-merged_data["Housing_Sales_Ratio"] = merged_data["City_Housing_Starts"] / (merged_data["sales_count_nowcast"] + 1)
-
-# Step 5: Handle missing values
-print("Handling missing values...")
-merged_data.fillna(method="ffill", inplace=True)
-merged_data.fillna(method="bfill", inplace=True)
-merged_data['City_Housing_Starts'].fillna(0, inplace=True)
-
-# Step 6: Save the processed data
-print(f"Saving updated processed data to {updated_data_path}...")
-os.makedirs(os.path.dirname(updated_data_path), exist_ok=True)
-merged_data.to_csv(updated_data_path, index=False)
-print("Data preprocessing completed successfully.")
+import pandas as pd
+import numpy as np
+import argparse
+import os
+from ingestion import read_wide_files, assemble_panel, panel_months, MERGE_KEYS
+from gap_fill import fill_gaps
+from feature_store import write_store, upsert_store, load_data, store_path
+from compact_panel import CompactPanel, frame_memory
+from instrumentation import span
+from rollups import build_rollups, write_rollups, rollups_size, rollups_path, ROLLUP_COLUMNS
+from incremental import load_manifest, save_manifest, build_manifest, detect_changes, widen_months
+
+# Paths
+raw_data_path = "./data/raw/"
+processed_data_path = "./data/processed/processed_data.csv"
+city_housing_starts_path = "./data/raw/city_level_housing_starts.csv"
+precision_report_path = "./outputs/panel_precision_report.csv"
+
+# Longest run of missing months bridged per region when filling gaps
+max_fill_gap = 3
+
+# File paths for all datasets
+file_paths = {
+    "new_construction_sales_all_homes": os.path.join(raw_data_path, "new_construction_sales_all_homes_monthly.csv"),
+    "new_construction_sales_condo_coop": os.path.join(raw_data_path, "new_construction_sales_condo_coop_monthly.csv"),
+    "new_construction_sales_sfr": os.path.join(raw_data_path, "new_construction_sales_sfr_monthly.csv"),
+    "median_sale_price_all_homes": os.path.join(raw_data_path, "median_sale_price_all_homes_monthly.csv"),
+    "median_list_price_all_homes": os.path.join(raw_data_path, "median_list_price_all_homes_monthly.csv"),
+    "market_heat_index": os.path.join(raw_data_path, "market_heat_index_all_homes_monthly.csv"),
+    "percent_sold_above_list_all_homes": os.path.join(raw_data_path, "percent_sold_above_list_all_homes_monthly.csv"),
+    "percent_sold_below_list_all_homes": os.path.join(raw_data_path, "percent_sold_below_list_all_homes_monthly.csv"),
+    "sales_count_nowcast": os.path.join(raw_data_path, "sales_count_nowcast_all_homes_monthly.csv"),
+    "total_transaction_value_all_homes": os.path.join(raw_data_path, "total_transaction_value_all_homes_monthly.csv"),
+    "zhvi_all_homes_smoothed": os.path.join(raw_data_path, "zhvi_all_homes_smoothed.csv"),
+    "zhvi_condo_coop": os.path.join(raw_data_path, "zhvi_condo_coop.csv"),
+    "zhvi_single_family_homes": os.path.join(raw_data_path, "zhvi_single_family_homes.csv"),
+    "median_days_to_pending_all_homes": os.path.join(raw_data_path, "median_days_to_pending_all_homes_monthly.csv"),
+    "median_days_to_close_all_homes": os.path.join(raw_data_path, "median_days_to_close_all_homes_monthly.csv"),
+}
+
+# Step 3: City Housing Starts columns used by the join, with explicit dtypes
+city_housing_starts_dtypes = {
+    "RegionID": "int32",
+    "SizeRank": "int32",
+    "RegionName": "string",
+    "RegionType": "category",
+    "StateName": "category",
+    "City_Housing_Starts": "float64",
+}
+city_housing_starts_chunk_rows = 50_000
+
+
+# Stream City Housing Starts in bounded chunks, reading only the join columns
+# and standardizing RegionName and Date as each chunk is parsed
+def iter_city_housing_starts(path=city_housing_starts_path, chunk_rows=city_housing_starts_chunk_rows):
+    reader = pd.read_csv(
+        path,
+        usecols=list(city_housing_starts_dtypes) + ["Date"],
+        dtype=city_housing_starts_dtypes,
+        parse_dates=["Date"],
+        chunksize=chunk_rows,
+    )
+    for chunk in reader:
+        chunk["RegionName"] = chunk["RegionName"].str.strip().str.lower().astype("category")
+        yield chunk
+
+
+# Left-join City_Housing_Starts onto merged_data chunk by chunk: the panel's
+# keys are hashed once and each chunk is looked up against them
+def join_city_housing_starts(merged_data, chunks):
+    panel_index = pd.MultiIndex.from_frame(merged_data[MERGE_KEYS])
+    starts = np.full(len(merged_data), np.nan)
+    for chunk in chunks:
+        rows = panel_index.get_indexer(pd.MultiIndex.from_frame(chunk[MERGE_KEYS]))
+        matched = rows >= 0
+        starts[rows[matched]] = chunk["City_Housing_Starts"].to_numpy()[matched]
+    merged_data["City_Housing_Starts"] = starts
+    return merged_data
+
+
+# Steps 3-5 on a merged (region, month) panel
+def process_panel(merged_data, starts_chunks):
+    merged_data['RegionName'] = merged_data['RegionName'].str.strip().str.lower()
+    merged_data['Date'] = pd.to_datetime(merged_data['Date'])
+
+    # Merge City_Housing_Starts into merged_data
+    with span("merge:city_housing_starts", rows=len(merged_data)):
+        merged_data = join_city_housing_starts(merged_data, starts_chunks)
+
+    # Step 4: Add interaction features
+    print("Adding interaction features...")
+    with span("feature_engineering", rows=len(merged_data)):
+        merged_data["Housing_Market_Interaction"] = merged_data["City_Housing_Starts"] * merged_data["market_heat_index"]
+        merged_data["Housing_Sales_Ratio"] = merged_data["City_Housing_Starts"] / (merged_data["sales_count_nowcast"] + 1)
+
+    # Step 5: Handle missing values
+    print("Handling missing values...")
+    metric_columns = [col for col in merged_data.columns if col not in MERGE_KEYS]
+    with span("fill", rows=len(merged_data)):
+        merged_data = fill_gaps(merged_data, metric_columns, group_col="RegionID", max_gap=max_fill_gap)
+        merged_data['City_Housing_Starts'] = merged_data['City_Housing_Starts'].fillna(0)
+    return merged_data
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--incremental", action="store_true",
+                        help="only rebuild months and regions whose raw inputs changed since the last run")
+    args = parser.parse_args()
+
+    # Step 1: Parse every wide file once
+    print("Loading datasets...")
+    with span("load"):
+        parsed = read_wide_files(file_paths)
+
+    # City Housing Starts is streamed in chunks each time it is needed
+    # instead of being held in memory for the whole run
+    previous = load_manifest(store_path) if args.incremental else None
+    manifest = build_manifest(file_paths, parsed, city_housing_starts_path, iter_city_housing_starts(), previous)
+    changes = detect_changes(previous, manifest, parsed) if args.incremental else None
+
+    if changes is None:
+        if args.incremental:
+            print("No usable previous run found, rebuilding everything...")
+
+        # Step 2: Build the merged (region, month) panel in one pass
+        print("Merging datasets...")
+        with span("merge") as s:
+            merged_data = assemble_panel(parsed)
+            s.rows = len(merged_data)
+        merged_data = process_panel(merged_data, iter_city_housing_starts())
+
+        # Step 6: Save the processed data to the columnar feature store
+        print(f"Saving updated processed data to {store_path}...")
+        os.makedirs(os.path.dirname(store_path), exist_ok=True)
+        with span("write_store", rows=len(merged_data)):
+            write_store(merged_data, store_path)
+
+        # Memory of the flat frame vs. the compact panel readers load, and the
+        # precision lost by each float32 downcast
+        panel = CompactPanel.from_frame(merged_data)
+        flat_mb, compact_mb = frame_memory(merged_data) / 2**20, panel.memory_usage() / 2**20
+        print(f"Panel memory: {flat_mb:.1f} MiB flat, {compact_mb:.1f} MiB compact "
+              f"({1 - compact_mb / flat_mb:.0%} smaller, {int(panel.report['downcast'].sum())}/{len(panel.report)} metrics float32)")
+        os.makedirs(os.path.dirname(precision_report_path), exist_ok=True)
+        panel.report.to_csv(precision_report_path, index=False)
+
+        # Step 7: Summaries the EDA scripts and dashboard charts render from
+        with span("rollups", rows=len(merged_data)):
+            write_rollups(build_rollups(merged_data), rollups_path)
+        print(f"Rollups written to {rollups_path} ({rollups_size(rollups_path) / 2**10:.0f} KiB)")
+    else:
+        changed_dates, changed_regions = changes
+        print(f"Changed months: {len(changed_dates)}, changed regions: {len(changed_regions)}")
+
+        if len(changed_dates) or changed_regions:
+            # Rows within max_fill_gap months of a change can be filled from it,
+            # and filling those rows looks back/ahead another max_fill_gap months
+            all_months = panel_months(parsed)
+            rebuild_dates = widen_months(changed_dates, all_months, max_fill_gap)
+            context_dates = widen_months(changed_dates, all_months, 2 * max_fill_gap)
+
+            print("Merging changed months and regions...")
+            with span("merge") as s:
+                merged_data = assemble_panel(parsed, only_dates=context_dates, only_regions=changed_regions)
+                s.rows = len(merged_data)
+            merged_data = process_panel(merged_data, iter_city_housing_starts())
+            rebuilt = merged_data["Date"].isin(rebuild_dates) | merged_data["RegionID"].isin(changed_regions)
+
+            print(f"Updating {int(rebuilt.sum())} rows in {store_path}...")
+            with span("write_store", rows=int(rebuilt.sum())):
+                upsert_store(merged_data[rebuilt], store_path)
+
+            # Quantiles and correlations span every region and month, so the
+            # rollups are rebuilt from the store's rollup columns
+            with span("rollups") as s:
+                store_data = load_data(columns=[c for c in ROLLUP_COLUMNS if c in merged_data.columns], path=store_path)
+                s.rows = len(store_data)
+                write_rollups(build_rollups(store_data), rollups_path)
+            print(f"Rollups written to {rollups_path} ({rollups_size(rollups_path) / 2**10:.0f} KiB)")
+
+    save_manifest(manifest, store_path)
+    print("Data preprocessing completed successfully.")
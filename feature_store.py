@@ -0,0 +1,102 @@
+import pandas as pd
+import pyarrow.dataset as ds
+import os
+import shutil
+from compact_panel import CompactPanel
+
+# Columnar replacement for updated_processed_data.csv: Parquet partitioned by
+# year, with region keys dictionary-encoded.
+store_path = "./data/processed/feature_store"
+
+CATEGORICAL_COLUMNS = ["RegionName", "RegionType", "StateName"]
+PARTITION_COLUMN = "Year"
+
+
+# -----------------------------
+# WRITE
+# -----------------------------
+def _prepare(df):
+    df = df.copy()
+    df["Date"] = pd.to_datetime(df["Date"])
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    df[PARTITION_COLUMN] = df["Date"].dt.year.astype("int16")
+    return df
+
+
+def write_store(df, path=store_path):
+    df = _prepare(df)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    df.to_parquet(path, engine="pyarrow", partition_cols=[PARTITION_COLUMN], index=False)
+    return path
+
+
+# Replace rows matching `keys` and append new ones. Only the year partitions
+# touched by `df` are read and rewritten.
+def upsert_store(df, path=store_path, keys=("RegionID", "Date")):
+    keys = list(keys)
+    df = _prepare(df)
+    years = sorted(df[PARTITION_COLUMN].unique().tolist())
+
+    existing = pd.read_parquet(path, engine="pyarrow", filters=[(PARTITION_COLUMN, "in", years)])
+    if len(existing):
+        existing[PARTITION_COLUMN] = existing[PARTITION_COLUMN].astype("int16")
+        replaced = pd.MultiIndex.from_frame(existing[keys]).isin(pd.MultiIndex.from_frame(df[keys]))
+        df = pd.concat([existing[~replaced], df], ignore_index=True)
+
+    df = _prepare(df.drop(columns=PARTITION_COLUMN)).sort_values(keys, ignore_index=True)
+    df.to_parquet(
+        path,
+        engine="pyarrow",
+        partition_cols=[PARTITION_COLUMN],
+        index=False,
+        existing_data_behavior="delete_matching",
+    )
+    return path
+
+
+# -----------------------------
+# READ
+# -----------------------------
+# Load only `columns`, and only rows for `regions` between `start` and `end`.
+# Date bounds also prune whole year partitions before any file is opened.
+def load_data(columns=None, regions=None, start=None, end=None, path=store_path):
+    filters = []
+    if regions is not None:
+        filters.append(("RegionName", "in", list(regions)))
+    if start is not None:
+        start = pd.Timestamp(start)
+        filters.append((PARTITION_COLUMN, ">=", start.year))
+        filters.append(("Date", ">=", start))
+    if end is not None:
+        end = pd.Timestamp(end)
+        filters.append((PARTITION_COLUMN, "<=", end.year))
+        filters.append(("Date", "<=", end))
+
+    data = pd.read_parquet(
+        path,
+        engine="pyarrow",
+        columns=list(columns) if columns is not None else None,
+        filters=filters or None,
+    )
+
+    if PARTITION_COLUMN in data.columns and (columns is None or PARTITION_COLUMN not in columns):
+        data = data.drop(columns=PARTITION_COLUMN)
+    return data
+
+
+# load_data() as a CompactPanel: region keys in a dimension table referenced
+# by int32 codes, metrics downcast to float32 where the round trip is safe.
+def load_panel(columns=None, regions=None, start=None, end=None, rtol=1e-6, path=store_path):
+    return CompactPanel.from_frame(load_data(columns, regions, start, end, path), rtol=rtol)
+
+
+# Stream the store as DataFrames of at most `batch_size` rows, reading only
+# `columns`; memory stays bounded by the batch size, not the store size.
+def iter_batches(columns=None, batch_size=100_000, path=store_path):
+    dataset = ds.dataset(path, format="parquet", partitioning="hive")
+    for batch in dataset.to_batches(columns=columns, batch_size=batch_size):
+        if batch.num_rows:
+            yield batch.to_pandas()
@@ -0,0 +1,40 @@
+import numpy as np
+
+# Model inputs, in the column order the scaler and models were fit on
+FEATURES = [
+    "City_Housing_Starts",
+    "new_construction_sales_all_homes",
+    "market_heat_index",
+    "percent_sold_above_list_all_homes",
+    "percent_sold_below_list_all_homes",
+    "sales_count_nowcast",
+    "total_transaction_value_all_homes",
+    "zhvi_all_homes_smoothed",
+    "Housing_Market_Interaction",
+    "Housing_Sales_Ratio",
+]
+
+TARGET = "zhvi_all_homes_smoothed"
+
+STARTS = FEATURES.index("City_Housing_Starts")
+HEAT = FEATURES.index("market_heat_index")
+SALES = FEATURES.index("sales_count_nowcast")
+INTERACTION = FEATURES.index("Housing_Market_Interaction")
+RATIO = FEATURES.index("Housing_Sales_Ratio")
+
+
+# Interaction features on a DataFrame
+def add_interaction_features(df):
+    df["Housing_Market_Interaction"] = df["City_Housing_Starts"] * df["market_heat_index"]
+    df["Housing_Sales_Ratio"] = df["City_Housing_Starts"] / (df["sales_count_nowcast"] + 1)
+    return df
+
+
+# Same features on an array whose last axis is in FEATURES order, with `extra`
+# housing units added to City_Housing_Starts first. Returns a new array.
+def with_extra_units(X, extra=0):
+    X = np.array(X, dtype="float64")
+    X[..., STARTS] += extra
+    X[..., INTERACTION] = X[..., STARTS] * X[..., HEAT]
+    X[..., RATIO] = X[..., STARTS] / (X[..., SALES] + 1)
+    return X
@@ -0,0 +1,68 @@
+import pandas as pd
+import numpy as np
+
+
+# -----------------------------
+# GROUP-AWARE GAP FILLING
+# -----------------------------
+# Forward-fill, then back-fill, each column within its own region only, bridging
+# at most `max_gap` months (measured on the date column, so months absent from
+# the frame count too). The (group, date) sort order, month numbers and group
+# bounds are computed once; each column is then filled on its own
+# with cumulative max/min scans and written back, so only one column is ever
+# copied at a time and values never leak across regions.
+def fill_gaps(df, columns=None, group_col="RegionID", date_col="Date", max_gap=3):
+    if columns is None:
+        columns = [c for c in df.select_dtypes("number").columns if c != group_col]
+    columns = [c for c in columns if df[c].isna().any()]
+    if len(df) == 0 or not columns:
+        return df
+
+    order = np.lexsort((df[date_col].to_numpy(), df[group_col].to_numpy()))
+    groups = df[group_col].to_numpy()[order]
+    dates = pd.DatetimeIndex(df[date_col].to_numpy()[order])
+    months = (dates.year * 12 + dates.month).to_numpy(dtype=np.int32)
+    del dates
+
+    n = len(df)
+    index_dtype = np.int32 if n < 2**31 - 1 else np.int64
+    rows = np.arange(n, dtype=index_dtype)
+
+    # First and last row of the group each sorted row belongs to
+    starts = np.ones(n, dtype=bool)
+    starts[1:] = groups[1:] != groups[:-1]
+    group_start = np.maximum.accumulate(np.where(starts, rows, 0))
+    ends = np.ones(n, dtype=bool)
+    ends[:-1] = starts[1:]
+    group_end = np.minimum.accumulate(np.where(ends, rows, n - 1)[::-1])[::-1]
+    del groups, starts, ends
+
+    # Rows already in (group, date) order need no gather/scatter
+    if np.array_equal(order, rows):
+        order = None
+
+    for name in columns:
+        dtype = df[name].dtype if df[name].dtype.kind == "f" else np.float64
+        column = df[name].to_numpy(dtype=dtype, copy=True)
+        if order is not None:
+            column = column[order]
+        missing = np.isnan(column)
+
+        # Nearest valid row at or before / at or after each row
+        prev_row = np.maximum.accumulate(np.where(missing, -1, rows))
+        next_row = np.minimum.accumulate(np.where(missing, n, rows)[::-1])[::-1]
+
+        use_prev = missing & (prev_row >= group_start) & (months - months[prev_row] <= max_gap)
+        use_next = (missing & ~use_prev & (next_row <= group_end)
+                    & (months[np.minimum(next_row, n - 1)] - months <= max_gap))
+
+        column[use_prev] = column[prev_row[use_prev]]
+        column[use_next] = column[next_row[use_next]]
+        del prev_row, next_row, use_prev, use_next, missing
+
+        if order is not None:
+            filled = np.empty_like(column)
+            filled[order] = column
+            column = filled
+        df[name] = column
+    return df
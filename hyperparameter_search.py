@@ -0,0 +1,319 @@
+import pandas as pd
+import numpy as np
+import argparse
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from sklearn.base import clone
+from sklearn.preprocessing import StandardScaler
+from feature_store import load_data, store_path
+from features import FEATURES, TARGET, add_interaction_features
+from backtesting import build_folds
+from instrumentation import span
+
+# -----------------------------
+# PATHS
+# -----------------------------
+output_path = "./outputs/hyperparameter_search/"
+best_params_path = os.path.join(output_path, "best_params.json")
+
+
+# -----------------------------
+# SEARCH SPACES
+# -----------------------------
+def uniform(low, high):
+    return lambda rng: float(rng.uniform(low, high))
+
+
+def loguniform(low, high):
+    return lambda rng: float(np.exp(rng.uniform(np.log(low), np.log(high))))
+
+
+def randint(low, high):
+    return lambda rng: int(rng.integers(low, high + 1))
+
+
+def choice(options):
+    return lambda rng: options[int(rng.integers(len(options)))]
+
+
+# Sampled hyperparameters per model file, and the resource a trial's budget
+# scales: "n_estimators" grows the ensemble, "rows" trains on the most recent
+# share of the training window. LinearRegression has nothing to tune.
+SEARCH_SPACES = {
+    "xgboost.pkl": {
+        "resource": "n_estimators",
+        "params": {
+            "learning_rate": loguniform(0.01, 0.3),
+            "max_depth": randint(3, 10),
+            "subsample": uniform(0.5, 1.0),
+            "colsample_bytree": uniform(0.5, 1.0),
+            "min_child_weight": loguniform(1, 20),
+            "reg_lambda": loguniform(0.1, 10),
+        },
+    },
+    "lightgbm.pkl": {
+        "resource": "n_estimators",
+        "params": {
+            "learning_rate": loguniform(0.01, 0.3),
+            "num_leaves": randint(15, 255),
+            "min_child_samples": randint(5, 100),
+            "subsample": uniform(0.5, 1.0),
+            "subsample_freq": choice([0, 1]),
+            "colsample_bytree": uniform(0.5, 1.0),
+            "reg_lambda": loguniform(1e-3, 10),
+        },
+    },
+    "random_forest.pkl": {
+        "resource": "n_estimators",
+        "params": {
+            "max_depth": choice([None, 8, 12, 16, 24, 32]),
+            "min_samples_leaf": randint(1, 20),
+            "max_features": choice([1.0, 0.5, "sqrt"]),
+        },
+    },
+    "gradient_boosting.pkl": {
+        "resource": "n_estimators",
+        "params": {
+            "learning_rate": loguniform(0.01, 0.3),
+            "max_depth": randint(2, 6),
+            "subsample": uniform(0.5, 1.0),
+            "min_samples_leaf": randint(1, 50),
+        },
+    },
+    "decision_tree.pkl": {
+        "resource": "rows",
+        "params": {
+            "max_depth": choice([None, 4, 6, 8, 12, 16, 24]),
+            "min_samples_leaf": randint(1, 50),
+        },
+    },
+    "lasso_regression.pkl": {
+        "resource": "rows",
+        "params": {
+            "alpha": loguniform(1e-5, 1.0),
+        },
+    },
+}
+
+
+def sample_config(space, rng):
+    return {name: sampler(rng) for name, sampler in space["params"].items()}
+
+
+# -----------------------------
+# SHARED TRAINING MATRIX
+# -----------------------------
+# The model_training.py rows sorted by month, scaled once and saved as .npy
+# so every trial in every worker memory-maps the same copy. Because rows are
+# in time order, each fold's training window is a prefix X[:train_stop] and
+# its validation window a slice: neither is ever copied. The scaler is fit on
+# the rows before the first validation month, so no validation row leaks
+# into any fold's scaling.
+def prepare_matrix(data, n_folds, test_months, data_dir):
+    data = add_interaction_features(data).dropna(subset=FEATURES).sort_values("Date", kind="stable")
+    dates = data["Date"].to_numpy()
+    X = data[FEATURES].to_numpy(dtype="float64")
+    y = data[TARGET].to_numpy(dtype="float64")
+
+    folds = []
+    for fold in build_folds(dates, n_folds, test_months, horizon=0):
+        folds.append({
+            "fold": fold["fold"],
+            "train_stop": int(np.searchsorted(dates, fold["test_start"], side="left")),
+            "test_stop": int(np.searchsorted(dates, fold["test_end"], side="right")),
+            "test_start": str(pd.Timestamp(fold["test_start"]).date()),
+        })
+    if not folds:
+        raise ValueError(f"Not enough months for {n_folds} folds of {test_months} months")
+
+    scaler = StandardScaler().fit(X[:folds[0]["train_stop"]])
+    np.save(os.path.join(data_dir, "X.npy"), scaler.transform(X))
+    np.save(os.path.join(data_dir, "y.npy"), y)
+    return folds
+
+
+# Memory-mapped matrix of the current worker, opened once per process
+_shared = {}
+
+
+def shared_matrix(data_dir):
+    if _shared.get("dir") != data_dir:
+        _shared.update(dir=data_dir, X=np.load(os.path.join(data_dir, "X.npy"), mmap_mode="r"),
+                       y=np.load(os.path.join(data_dir, "y.npy"), mmap_mode="r"))
+    return _shared["X"], _shared["y"]
+
+
+# -----------------------------
+# TRIAL
+# -----------------------------
+# Fit one configuration on one fold at `fraction` of the full resource and
+# return its validation MAE and the CPU seconds it used
+def run_trial(template, params, resource, fraction, max_estimators, fold, data_dir):
+    X, y = shared_matrix(data_dir)
+    model = clone(template).set_params(**params)
+    if "n_jobs" in model.get_params():
+        model.set_params(n_jobs=1)  # parallelism comes from running trials concurrently
+
+    train_start = 0
+    if resource == "n_estimators":
+        model.set_params(n_estimators=max(1, round(fraction * max_estimators)))
+    else:
+        train_start = fold["train_stop"] - max(1, round(fraction * fold["train_stop"]))
+
+    cpu = time.process_time()
+    model.fit(X[train_start:fold["train_stop"]], y[train_start:fold["train_stop"]])
+    preds = model.predict(X[fold["train_stop"]:fold["test_stop"]])
+    return {
+        "fold": fold["fold"],
+        "MAE": float(np.mean(np.abs(np.asarray(preds) - y[fold["train_stop"]:fold["test_stop"]]))),
+        "cpu_seconds": time.process_time() - cpu,
+    }
+
+
+# -----------------------------
+# HYPERBAND
+# -----------------------------
+# Successive halving brackets from many cheap trials to few full ones. Each
+# rung fits every surviving config on every fold in parallel, keeps the best
+# 1/eta by mean validation MAE and gives them eta times more resource.
+# `budget_seconds` of worker CPU time caps the search: spend is counted as each
+# trial finishes, and once it is reached the queued trials are cancelled (only
+# those already running finish, at most one per worker). Returns one row per
+# (config, rung) scored on every fold.
+def hyperband(pool, name, template, space, folds, data_dir, budget_seconds, max_estimators=300,
+              min_fraction=1 / 27, eta=3, rng=None):
+    rng = rng or np.random.default_rng()
+    s_max = int(round(math.log(1 / min_fraction, eta)))
+    trials, spent, config_id = [], 0.0, 0
+
+    for s in range(s_max, -1, -1):
+        n = math.ceil((s_max + 1) / (s + 1) * eta ** s)
+        configs = []
+        for _ in range(n):
+            configs.append((config_id, sample_config(space, rng)))
+            config_id += 1
+
+        for rung in range(s + 1):
+            if spent >= budget_seconds:
+                return trials, spent
+            fraction = min(1.0, eta ** (rung - s))
+            futures = {pool.submit(run_trial, template, params, space["resource"], fraction,
+                                   max_estimators, fold, data_dir): (cid, params)
+                       for cid, params in configs for fold in folds}
+
+            scores = {}
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                result = future.result()
+                spent += result["cpu_seconds"]
+                cid, params = futures[future]
+                scores.setdefault(cid, (params, []))[1].append(result)
+                if spent >= budget_seconds:
+                    for pending in futures:
+                        pending.cancel()
+
+            # Configs cut short by the budget are not compared on partial folds
+            rung_rows = []
+            for cid, (params, results) in scores.items():
+                if len(results) < len(folds):
+                    continue
+                rung_rows.append({
+                    "model": name, "bracket": s, "rung": rung, "config": cid, "fraction": fraction,
+                    "MAE": float(np.mean([r["MAE"] for r in results])),
+                    "cpu_seconds": sum(r["cpu_seconds"] for r in results),
+                    "params": params,
+                })
+            if not rung_rows:
+                return trials, spent
+            rung_rows.sort(key=lambda row: row["MAE"])
+            trials += rung_rows
+            print(f"   bracket {s} rung {rung}: {len(configs)} config(s) at {fraction:.0%} resource, "
+                  f"best MAE {rung_rows[0]['MAE']:,.4f} ({spent / 60:.1f} CPU-min spent)")
+
+            keep = {row["config"] for row in rung_rows[:max(1, len(configs) // eta)]}
+            configs = [(cid, params) for cid, params in configs if cid in keep]
+    return trials, spent
+
+
+# Best config: lowest MAE among trials at the largest resource reached.
+# For n_estimators models the winning ensemble size is part of the config.
+def best_config(trials, space, max_estimators):
+    top = max(row["fraction"] for row in trials)
+    best = min((row for row in trials if row["fraction"] == top), key=lambda row: row["MAE"])
+    params = dict(best["params"])
+    if space["resource"] == "n_estimators":
+        params["n_estimators"] = max(1, round(best["fraction"] * max_estimators))
+    return {"params": params, "MAE": best["MAE"], "fraction": best["fraction"],
+            "bracket": best["bracket"], "config": best["config"]}
+
+
+def load_best_params(path=best_params_path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    from model_training import models
+
+    parser = argparse.ArgumentParser(description="Hyperband search over the model_training.py zoo.")
+    parser.add_argument("--models", nargs="*", default=list(SEARCH_SPACES), choices=list(SEARCH_SPACES))
+    parser.add_argument("--budget-cpu-hours", type=float, default=1.0,
+                        help="worker CPU time for the whole search, shared across models")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--folds", type=int, default=3)
+    parser.add_argument("--test-months", type=int, default=6)
+    parser.add_argument("--max-estimators", type=int, default=300, help="ensemble size at full resource")
+    parser.add_argument("--min-fraction", type=float, default=1 / 27, help="resource of the cheapest trials")
+    parser.add_argument("--eta", type=int, default=3, help="keep 1/eta of the configs at every rung")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--store", default=store_path)
+    args = parser.parse_args()
+
+    print("🔄 Loading processed dataset...")
+    base_columns = ["Date"] + [c for c in FEATURES if c not in ("Housing_Market_Interaction", "Housing_Sales_Ratio")]
+    data = load_data(columns=base_columns, path=args.store)
+
+    data_dir = tempfile.mkdtemp(prefix="hyperband_")
+    try:
+        with span("prepare", rows=len(data)):
+            folds = prepare_matrix(data, args.folds, args.test_months, data_dir)
+        print(f"📌 Shared matrix: {np.load(os.path.join(data_dir, 'X.npy'), mmap_mode='r').shape}, "
+              f"validation folds from {', '.join(f['test_start'] for f in folds)}")
+
+        rng = np.random.default_rng(args.seed)
+        budget = args.budget_cpu_hours * 3600
+        best, all_trials = load_best_params(), []
+        with ProcessPoolExecutor(args.workers) as pool:
+            for i, name in enumerate(args.models):
+                # Budget left over by earlier models goes to the remaining ones
+                share = budget / (len(args.models) - i)
+                print(f"\n🚀 Searching {name} ({share / 3600:.2f} CPU-h)...")
+                with span(f"search:{name}"):
+                    trials, spent = hyperband(pool, name, models[name], SEARCH_SPACES[name], folds, data_dir,
+                                              share, args.max_estimators, args.min_fraction, args.eta, rng)
+                budget -= spent
+                if not trials:
+                    print(f"   ⚠️ No budget left for {name}")
+                    continue
+                best[name] = best_config(trials, SEARCH_SPACES[name], args.max_estimators)
+                all_trials += trials
+                print(f"   ✔ Best {name}: MAE {best[name]['MAE']:,.4f} with {best[name]['params']}")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    os.makedirs(output_path, exist_ok=True)
+    with open(best_params_path, "w") as f:
+        json.dump(best, f, indent=4)
+    trials_frame = pd.DataFrame(all_trials)
+    if len(trials_frame):
+        trials_frame["params"] = trials_frame["params"].map(json.dumps)
+    trials_frame.to_csv(os.path.join(output_path, "trials.csv"), index=False)
+    print(f"\n🎉 Best configurations saved in {best_params_path} (model_training.py applies them)")
@@ -0,0 +1,149 @@
+import pandas as pd
+import numpy as np
+import hashlib
+import json
+import os
+
+# Fingerprints of the raw inputs from the last successful preprocessing run.
+# The leading underscore keeps pyarrow from treating it as part of the store.
+MANIFEST_NAME = "_manifest.json"
+
+
+# -----------------------------
+# FINGERPRINTS
+# -----------------------------
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _digest(*arrays):
+    digest = hashlib.sha1()
+    for arr in arrays:
+        digest.update(np.ascontiguousarray(arr).tobytes())
+    return digest.hexdigest()[:16]
+
+
+# Hash every month column (over `regions`) and every region row (over `dates`)
+# of a parsed wide file, so a new month changes no region hash and a new
+# region changes no month hash.
+def fingerprint_wide(parsed_file, regions=None, dates=None):
+    keys, file_dates, values = parsed_file
+    region_ids = keys["RegionID"].astype(str).to_numpy()
+    date_labels = np.asarray(file_dates.strftime("%Y-%m-%d"))
+
+    row_order = np.argsort(region_ids, kind="stable")
+    if regions is not None:
+        row_order = row_order[np.isin(region_ids[row_order], list(regions))]
+    col_order = np.argsort(date_labels, kind="stable")
+    if dates is not None:
+        col_order = col_order[np.isin(date_labels[col_order], list(dates))]
+
+    ordered_ids = region_ids[row_order].astype("U")
+    key_labels = keys.astype(str).to_numpy().astype("U")
+    columns = {
+        date_labels[j]: _digest(ordered_ids, values[row_order, j])
+        for j in range(len(date_labels))
+    }
+    rows = {
+        region_ids[i]: _digest(key_labels[i], values[i, col_order])
+        for i in range(len(region_ids))
+    }
+    return {"columns": columns, "regions": rows}
+
+
+# Hash the housing starts rows of each month from a stream of chunks. Row
+# hashes are summed per month (mod 2**64), so the result does not depend on
+# row order or on how the file was split into chunks.
+def fingerprint_starts(chunks):
+    sums, counts = {}, {}
+    for chunk in chunks:
+        rows = pd.util.hash_pandas_object(chunk[["RegionID", "City_Housing_Starts"]].astype("float64"), index=False)
+        labels, positions = np.unique(chunk["Date"].dt.strftime("%Y-%m-%d").to_numpy(), return_inverse=True)
+        partial = np.zeros(len(labels), dtype="uint64")
+        np.add.at(partial, positions, rows.to_numpy())
+        for label, total, n in zip(labels, partial, np.bincount(positions)):
+            sums[label] = (sums.get(label, 0) + int(total)) % (1 << 64)
+            counts[label] = counts.get(label, 0) + int(n)
+    return {label: f"{sums[label]:016x}-{counts[label]}" for label in sorted(sums)}
+
+
+# -----------------------------
+# MANIFEST
+# -----------------------------
+def load_manifest(store_path):
+    path = os.path.join(store_path, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, store_path):
+    with open(os.path.join(store_path, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f)
+
+
+# Fingerprint every input, reusing the previous entry for files whose bytes
+# have not changed. `starts_chunks` is only consumed when the housing starts
+# file changed.
+def build_manifest(file_paths, parsed, starts_path, starts_chunks, previous=None):
+    previous_files = (previous or {}).get("files", {})
+    files = {}
+    for name, parsed_file in parsed.items():
+        sha = file_sha256(file_paths[name])
+        if name in previous_files and previous_files[name]["sha256"] == sha:
+            files[name] = previous_files[name]
+        else:
+            files[name] = {"sha256": sha, **fingerprint_wide(parsed_file)}
+
+    starts_sha = file_sha256(starts_path)
+    if previous and previous["starts"]["sha256"] == starts_sha:
+        starts = previous["starts"]
+    else:
+        starts = {"sha256": starts_sha, "columns": fingerprint_starts(starts_chunks)}
+    return {"files": files, "starts": starts}
+
+
+# -----------------------------
+# CHANGE DETECTION
+# -----------------------------
+# Months and RegionIDs whose processed rows must be rebuilt since `previous`.
+# Returns None when the change cannot be applied incrementally (no previous
+# run, or the set of metric files changed).
+def detect_changes(previous, current, parsed):
+    if previous is None or set(previous["files"]) != set(current["files"]):
+        return None
+
+    changed_dates, changed_regions = set(), set()
+    for name, entry in current["files"].items():
+        old = previous["files"][name]
+        if entry["sha256"] == old["sha256"]:
+            continue
+
+        # Compare on the regions / months both runs know about
+        known = fingerprint_wide(parsed[name], regions=old["regions"].keys(), dates=old["columns"].keys())
+        changed_dates |= {d for d, h in known["columns"].items() if old["columns"].get(d) != h}
+        changed_regions |= {r for r, h in known["regions"].items() if old["regions"].get(r) != h}
+
+    old_starts = previous["starts"]["columns"]
+    changed_dates |= {d for d, h in current["starts"]["columns"].items() if old_starts.get(d) != h}
+
+    return (
+        pd.DatetimeIndex(sorted(changed_dates)),
+        sorted(int(r) for r in changed_regions if r.lstrip("-").isdigit()),
+    )
+
+
+# Months within `months` steps of any changed month, on the panel's calendar
+def widen_months(changed, all_months, months):
+    if len(changed) == 0:
+        return changed
+    positions = all_months.get_indexer(changed)
+    positions = positions[positions >= 0]
+    window = np.arange(-months, months + 1)
+    widened = np.unique(np.clip((positions[:, None] + window).ravel(), 0, len(all_months) - 1))
+    return all_months[widened].union(changed)
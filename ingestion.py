@@ -0,0 +1,110 @@
+import pandas as pd
+import numpy as np
+import os
+from instrumentation import span
+
+# Region keys shared by every Zillow wide file
+ID_VARS = ["RegionID", "SizeRank", "RegionName", "RegionType", "StateName"]
+MERGE_KEYS = ID_VARS + ["Date"]
+
+
+# -----------------------------
+# WIDE FILE PARSING
+# -----------------------------
+# Read one wide file and split it into region keys, parsed month columns and the value block
+def read_wide_file(path, id_vars=ID_VARS):
+    df = pd.read_csv(path)
+
+    # Ensure all required keys are present
+    for key in id_vars:
+        if key not in df.columns:
+            df[key] = None  # Add missing keys with default None
+
+    value_cols = [col for col in df.columns if col not in id_vars]
+    dates = pd.to_datetime(pd.Index(value_cols), errors="coerce")
+    keep = ~dates.isna()
+
+    keys = df[id_vars]
+    values = df[[c for c, k in zip(value_cols, keep) if k]].to_numpy(dtype="float64")
+    return keys, dates[keep], values
+
+
+# Parse every available wide file once, keyed by metric name
+def read_wide_files(file_paths, id_vars=ID_VARS, verbose=True):
+    parsed = {}
+    for name, path in file_paths.items():
+        if os.path.exists(path):
+            if verbose:
+                print(f"Processing dataset: {name}")
+            with span(f"load:{name}") as s:
+                parsed[name] = read_wide_file(path, id_vars)
+                s.rows = len(parsed[name][0])
+        elif verbose:
+            print(f"File not found: {path}")
+    return parsed
+
+
+# -----------------------------
+# SINGLE-PASS PANEL BUILD
+# -----------------------------
+# Map every parsed file onto a shared (region, month) index and fill all
+# metrics into one preallocated array. Produces the same rows and columns as
+# melting each file and chaining outer merges on MERGE_KEYS.
+# `only_dates` / `only_regions` restrict the output to cells whose month, or
+# whose RegionID, is listed (used by incremental refreshes).
+def assemble_panel(parsed, id_vars=ID_VARS, only_dates=None, only_regions=None):
+    if not parsed:
+        return pd.DataFrame(columns=id_vars + ["Date"])
+
+    # Shared region index (NaN keys compare equal, as they do in pd.merge)
+    all_keys = pd.concat([keys for keys, _, _ in parsed.values()], ignore_index=True)
+    region_codes = all_keys.groupby(id_vars, dropna=False, sort=False).ngroup().to_numpy()
+    regions = all_keys[~pd.Series(region_codes).duplicated().to_numpy()].reset_index(drop=True)
+
+    # Shared month index
+    all_dates = panel_months(parsed)
+
+    n_regions, n_dates, n_metrics = len(regions), len(all_dates), len(parsed)
+    values = np.full((n_regions * n_dates, n_metrics), np.nan)
+    present = np.zeros(n_regions * n_dates, dtype=bool)
+
+    offset = 0
+    for m, (name, (keys, dates, block)) in enumerate(parsed.items()):
+        with span(f"melt:{name}", rows=block.size):
+            rows = region_codes[offset:offset + len(keys)]
+            offset += len(keys)
+            cols = all_dates.get_indexer(dates)
+            cells = (rows[:, None] * n_dates + cols[None, :]).ravel()
+            values[cells, m] = block.ravel()
+            present[cells] = True
+
+    if only_dates is not None or only_regions is not None:
+        keep = np.zeros((n_regions, n_dates), dtype=bool)
+        if only_dates is not None:
+            keep[:, all_dates.isin(only_dates)] = True
+        if only_regions is not None:
+            keep[regions["RegionID"].isin(only_regions).to_numpy(), :] = True
+        present &= keep.ravel()
+
+    # Keep only (region, month) cells that appear in at least one file
+    cells = np.flatnonzero(present)
+    region_idx, date_idx = np.divmod(cells, n_dates)
+
+    panel = regions.iloc[region_idx].reset_index(drop=True)
+    panel["Date"] = all_dates[date_idx]
+    metrics = pd.DataFrame(values[cells], columns=list(parsed.keys()))
+    panel = pd.concat([panel, metrics], axis=1)
+
+    # Outer merges return keys in lexicographic order
+    return panel.sort_values(MERGE_KEYS, kind="stable", ignore_index=True)
+
+
+# Sorted union of the month columns across parsed files
+def panel_months(parsed):
+    return pd.DatetimeIndex(
+        np.unique(np.concatenate([dates.values for _, dates, _ in parsed.values()]))
+    )
+
+
+def build_panel(file_paths, id_vars=ID_VARS, verbose=True):
+    return assemble_panel(read_wide_files(file_paths, id_vars, verbose), id_vars)
@@ -0,0 +1,152 @@
+import atexit
+import cProfile
+import json
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# -----------------------------
+# SETTINGS
+# -----------------------------
+# Tracing is off unless PIPELINE_TRACE names an output file, e.g.
+#   PIPELINE_TRACE=outputs/trace.json python data_preprocessing.py
+# The file is Chrome trace-event JSON (open it in chrome://tracing or
+# https://ui.perfetto.dev). PIPELINE_PROFILE=cprofile additionally runs every
+# top-level span under cProfile and saves <trace>.<span>.prof next to it.
+trace_path = os.environ.get("PIPELINE_TRACE") or None
+profile_mode = os.environ.get("PIPELINE_PROFILE") or None
+# Spans kept in memory: long-running servers (app.py, prediction_service.py)
+# record one per batch, so only the most recent ones are kept
+max_events = int(os.environ.get("PIPELINE_TRACE_MAX_EVENTS") or 100_000)
+
+_events = deque(maxlen=max_events)
+_dropped = [0]
+_local = threading.local()
+
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        # No /proc (macOS, Windows): fall back to the peak
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def enabled():
+    return trace_path is not None
+
+
+# Turn tracing on from code instead of the environment
+def enable(path, profile=None):
+    global trace_path, profile_mode
+    trace_path, profile_mode = path, profile
+
+
+# -----------------------------
+# SPANS
+# -----------------------------
+class Span:
+    def __init__(self, name, rows=None, attrs=None):
+        self.name = name
+        self.rows = rows
+        self.attrs = dict(attrs or {})
+
+
+# Time a pipeline stage. Records wall time, rows (set `s.rows` inside the
+# block when only known at the end), RSS before/after and any extra attrs.
+# A no-op apart from creating the Span when tracing is off.
+@contextmanager
+def span(name, rows=None, **attrs):
+    s = Span(name, rows, attrs)
+    if not enabled():
+        yield s
+        return
+
+    depth = getattr(_local, "depth", 0)
+    profiler = cProfile.Profile() if profile_mode == "cprofile" and depth == 0 else None
+    _local.depth = depth + 1
+    rss_before = current_rss_mb()
+    start_us = time.time_ns() // 1000
+    start = time.perf_counter()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield s
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        seconds = time.perf_counter() - start
+        rss_after = current_rss_mb()
+        _local.depth = depth
+
+        args = {"rows": s.rows, "rss_mb": round(rss_after, 1),
+                "mem_delta_mb": round(rss_after - rss_before, 1), **s.attrs}
+        if s.rows:
+            args["rows_per_s"] = round(s.rows / seconds, 1) if seconds else None
+        _keep([{
+            "name": name, "cat": name.split(":")[0], "ph": "X",
+            "ts": start_us, "dur": round(seconds * 1e6, 1),
+            "pid": os.getpid(), "tid": threading.get_ident(),
+            "args": args,
+        }])
+        if profiler is not None:
+            stem = os.path.splitext(trace_path)[0]
+            profiler.dump_stats(f"{stem}.{re.sub(r'[^A-Za-z0-9_.-]+', '_', name)}.prof")
+
+
+def _keep(events):
+    _dropped[0] += max(len(_events) + len(events) - max_events, 0)
+    _events.extend(events)
+
+
+# Hand spans recorded in a worker process back to the parent, which passes
+# them to record(); workers never write the trace file themselves.
+def drain():
+    events = list(_events)
+    _events.clear()
+    return events
+
+
+def record(events):
+    _keep(events or [])
+
+
+# -----------------------------
+# EXPORT
+# -----------------------------
+def write_trace(path=None):
+    path = path or trace_path
+    if path is None or not _events:
+        return None
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"traceEvents": list(_events), "displayTimeUnit": "ms",
+                   "otherData": {"dropped_events": _dropped[0]}}, f)
+    return path
+
+
+# Slowest spans of the run, one line each
+def summary(limit=15):
+    lines = []
+    for event in sorted(_events, key=lambda e: e["dur"], reverse=True)[:limit]:
+        args = event["args"]
+        rows = f"{args['rows']:>12,}" if args.get("rows") is not None else f"{'':>12}"
+        lines.append(f"{event['name']:<40} {event['dur'] / 1e6:9.3f} s {rows} rows "
+                     f"{args['mem_delta_mb']:+9.1f} MiB")
+    return "\n".join(lines)
+
+
+def _write_at_exit():
+    if multiprocessing.parent_process() is None and write_trace():
+        print(f"\n⏱ Slowest stages:\n{summary()}\nTrace written to {trace_path}")
+
+
+atexit.register(_write_at_exit)
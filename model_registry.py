@@ -0,0 +1,106 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from compiled_trees import CompiledEnsemble, read_meta
+
+
+# -----------------------------
+# MODEL REGISTRY
+# -----------------------------
+# Keeps deserialized models (and the scaler) in a bounded LRU cache keyed by
+# (file name, content hash). When model_training.py rewrites an artifact its
+# hash changes, so the next lookup reloads it instead of serving the stale one.
+# Tree models with an up-to-date flat-array export are served from that
+# (memory-mapped, no unpickling) instead of the pickle.
+class ModelRegistry:
+    def __init__(self, model_path, max_models=4, use_compiled=True):
+        self.model_path = model_path
+        self.max_models = max_models
+        self.use_compiled = use_compiled
+        self._models = OrderedDict()
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    def signature(self, name):
+        stat = os.stat(os.path.join(self.model_path, name))
+        return [stat.st_size, stat.st_mtime_ns]
+
+    # sha256 of the artifact, recomputed only when its size or mtime changes
+    def file_hash(self, name):
+        path = os.path.join(self.model_path, name)
+        signature = tuple(self.signature(name))
+        cached = self._hashes.get(name)
+        if cached is None or cached[0] != signature:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+            cached = (signature, digest.hexdigest())
+            self._hashes[name] = cached
+        return cached[1]
+
+    # Flat-array export of a tree model written by model_training.py
+    def compiled_dir(self, name):
+        return os.path.join(self.model_path, "compiled", os.path.splitext(name)[0])
+
+    def _compiled_meta(self, name):
+        compiled = self.compiled_dir(name)
+        return read_meta(compiled) if os.path.exists(os.path.join(compiled, "meta.json")) else None
+
+    # Content hash of the artifact a model was trained to. It comes from the
+    # compiled export's record when only the export was shipped, or when the
+    # pickle's size and mtime still match that record (large forests would
+    # otherwise be read in full on every cold start).
+    def source_hash(self, name, meta=None):
+        meta = meta if meta is not None else self._compiled_meta(name)
+        if meta is not None and not os.path.exists(os.path.join(self.model_path, name)):
+            return meta["source_sha256"]
+        if meta is not None and meta.get("source_signature") == self.signature(name):
+            return meta["source_sha256"]
+        return self.file_hash(name)
+
+    def get(self, name):
+        path = os.path.join(self.model_path, name)
+        compiled = self.compiled_dir(name)
+        meta = self._compiled_meta(name) if self.use_compiled else None
+
+        # A compiled export is used when it was built from the current pickle,
+        # or when only the export was shipped
+        digest = self.source_hash(name, meta) if meta is not None else self.file_hash(name)
+        use_compiled = meta is not None and meta.get("source_sha256") == digest
+        key = (name, digest)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+
+        if use_compiled:
+            model = CompiledEnsemble.load(compiled, mmap=True)
+        elif name.endswith(".h5"):
+            from sequences import load_lstm
+            model = load_lstm(path)
+        else:
+            with open(path, "rb") as f:
+                model = pickle.load(f)
+
+        with self._lock:
+            # Drop older versions of the same artifact, then the least recently used
+            for stale in [k for k in self._models if k[0] == name]:
+                del self._models[stale]
+            self._models[key] = model
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+        return model
+
+    # Load artifacts ahead of first use; missing files are skipped
+    def preload(self, names):
+        for name in names:
+            try:
+                self.get(name)
+            except FileNotFoundError:
+                print(f"Model file not found, skipping preload: {name}")
+
+    def cached(self):
+        return [name for name, _ in self._models]
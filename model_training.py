@@ -1,147 +1,226 @@
-import pandas as pd
-import numpy as np
-import pickle
-import os
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.tree import DecisionTreeRegressor
-from sklearn.linear_model import LinearRegression, Lasso
-from xgboost import XGBRegressor
-import lightgbm as lgb
-
-# -----------------------------
-# PATHS
-# -----------------------------
-data_path = "./Data/processed/updated_processed_data.csv"
-model_path = "./Models/"
-os.makedirs(model_path, exist_ok=True)
-
-print("🔄 Loading processed dataset...")
-data = pd.read_csv(data_path)
-
-# -----------------------------
-# CREATE ENGINEERED FEATURES
-# -----------------------------
-data["Housing_Market_Interaction"] = (
-    data["City_Housing_Starts"] * data["market_heat_index"]
-)
-
-data["Housing_Sales_Ratio"] = (
-    data["City_Housing_Starts"] / (data["sales_count_nowcast"] + 1)
-)
-
-# -----------------------------
-# FEATURES + TARGET
-# -----------------------------
-features = [
-    "City_Housing_Starts",
-    "new_construction_sales_all_homes",
-    "market_heat_index",
-    "percent_sold_above_list_all_homes",
-    "percent_sold_below_list_all_homes",
-    "sales_count_nowcast",
-    "total_transaction_value_all_homes",
-    "zhvi_all_homes_smoothed",
-    "Housing_Market_Interaction",
-    "Housing_Sales_Ratio",
-]
-
-target = "zhvi_all_homes_smoothed"
-
-X = data[features].copy()
-y = data[target].copy()
-
-# -----------------------------
-# TRAIN/TEST SPLIT
-# -----------------------------
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42
-)
-
-# -----------------------------
-# SCALE FEATURES
-# -----------------------------
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
-
-pickle.dump(scaler, open(model_path + "scaler.pkl", "wb"))
-print("📌 Saved scaler.pkl")
-
-
-# -----------------------------
-# MODELS TO TRAIN
-# -----------------------------
-models = {
-    "random_forest.pkl": RandomForestRegressor(n_estimators=300, random_state=42),
-    "gradient_boosting.pkl": GradientBoostingRegressor(random_state=42),
-    "xgboost.pkl": XGBRegressor(
-        n_estimators=300,
-        learning_rate=0.05,
-        max_depth=6,
-        subsample=0.8,
-        colsample_bytree=0.8,
-        random_state=42,
-        objective="reg:squarederror"
-    ),
-    "lightgbm.pkl": lgb.LGBMRegressor(
-        n_estimators=300, learning_rate=0.05, random_state=42
-    ),
-    "decision_tree.pkl": DecisionTreeRegressor(random_state=42),
-    "linear_regression.pkl": LinearRegression(),
-    "lasso_regression.pkl": Lasso(alpha=0.001)
-}
-
-
-# -----------------------------
-# TRAIN & SAVE ALL MODELS
-# -----------------------------
-print("\n🚀 Starting model training...\n")
-
-for filename, model in models.items():
-    print(f"➡️ Training {filename}...")
-    model.fit(X_train_scaled, y_train)
-    pickle.dump(model, open(model_path + filename, "wb"))
-    print(f"   ✔ Saved {filename}")
-
-print("\n🎉 ALL MODELS TRAINED AND SAVED SUCCESSFULLY!\n")
-
-from sklearn.metrics import mean_absolute_error, r2_score
-
-print("\n🔍 Loading trained models for evaluation...")
-
-# Load models you trained
-xgb_model = pickle.load(open("./models/xgboost.pkl", "rb"))
-rf_model = pickle.load(open("./models/random_forest.pkl", "rb"))
-lgbm_model = pickle.load(open("./models/lightgbm.pkl", "rb"))
-linear_model = pickle.load(open("./models/linear_regression.pkl", "rb"))
-tree_model = pickle.load(open("./models/decision_tree.pkl", "rb"))
-
-# Dictionary to store metrics
-results = {}
-
-def evaluate_model(name, model, X_test_scaled, y_test):
-    preds = model.predict(X_test_scaled)
-    mae = mean_absolute_error(y_test, preds)
-    r2 = r2_score(y_test, preds)
-    
-    results[name] = {"MAE": mae, "R2": r2}
-    print(f"\n📌 {name} Evaluation:")
-    print(f"   MAE = {mae:,.4f}")
-    print(f"   R²  = {r2:,.4f}")
-
-# Run evaluation
-evaluate_model("XGBoost", xgb_model, X_test_scaled, y_test)
-evaluate_model("Random Forest", rf_model, X_test_scaled, y_test)
-evaluate_model("LightGBM", lgbm_model, X_test_scaled, y_test)
-evaluate_model("Linear Regression", linear_model, X_test_scaled, y_test)
-evaluate_model("Decision Tree", tree_model, X_test_scaled, y_test)
-
-# Save metrics
-import json
-with open("./outputs/model_metrics.json", "w") as f:
-    json.dump(results, f, indent=4)
-
-print("\n🎉 Evaluation complete! Metrics saved in outputs/model_metrics.json")
-
+import pandas as pd
+import numpy as np
+import pickle
+import os
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.tree import DecisionTreeRegressor
+from sklearn.linear_model import LinearRegression, Lasso
+from xgboost import XGBRegressor
+import lightgbm as lgb
+from sklearn.metrics import mean_absolute_error, r2_score
+from feature_store import load_data
+from features import FEATURES, TARGET
+from training_scheduler import train_models
+from model_registry import ModelRegistry
+from compiled_trees import compile_model, save_compiled, CompiledEnsemble
+from instrumentation import span
+import json
+import argparse
+import hashlib
+from artifact_cache import ArtifactCache, Hasher, stage_key
+from hyperparameter_search import load_best_params
+
+# -----------------------------
+# PATHS
+# -----------------------------
+model_path = "./Models/"
+os.makedirs(model_path, exist_ok=True)
+
+# -----------------------------
+# MODELS TO TRAIN
+# -----------------------------
+models = {
+    "random_forest.pkl": RandomForestRegressor(n_estimators=300, random_state=42),
+    "gradient_boosting.pkl": GradientBoostingRegressor(random_state=42),
+    "xgboost.pkl": XGBRegressor(
+        n_estimators=300,
+        learning_rate=0.05,
+        max_depth=6,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        random_state=42,
+        objective="reg:squarederror"
+    ),
+    "lightgbm.pkl": lgb.LGBMRegressor(
+        n_estimators=300, learning_rate=0.05, random_state=42
+    ),
+    "decision_tree.pkl": DecisionTreeRegressor(random_state=42),
+    "linear_regression.pkl": LinearRegression(),
+    "lasso_regression.pkl": Lasso(alpha=0.001)
+}
+
+# Configurations chosen by hyperparameter_search.py override the defaults
+# above (delete outputs/hyperparameter_search/best_params.json to go back)
+for filename, best in load_best_params().items():
+    if filename in models:
+        models[filename].set_params(**best["params"])
+
+
+# -----------------------------
+# FLAT-ARRAY EXPORT
+# -----------------------------
+# Convert a saved tree model into the compiled_trees format next to its pickle
+# (Models/compiled/<name>/), tagged with the pickle's hash so the registry only
+# serves it for that exact model. Non-tree models, and trees the format cannot
+# reproduce exactly, are skipped.
+def export_compiled(filename, X_check):
+    registry = ModelRegistry(model_path, use_compiled=False)
+    model = registry.get(filename)
+    try:
+        arrays, meta = compile_model(model)
+    except (TypeError, ValueError):
+        return None
+
+    compiled = CompiledEnsemble(arrays, meta)
+    meta["source_sha256"] = registry.file_hash(filename)
+    meta["source_signature"] = registry.signature(filename)
+    meta["max_abs_error"] = float(np.max(np.abs(compiled.predict(X_check) - model.predict(X_check))))
+    save_compiled(arrays, meta, registry.compiled_dir(filename))
+    return meta
+
+
+# -----------------------------
+# ARTIFACT CACHE KEYS
+# -----------------------------
+# A model is retrained only when its training data, its class and
+# hyperparameters, or the code that fits/exports it change. Other entries of
+# the `models` dict do not enter its key.
+TRAINING_CODE = [os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+                 for name in ["training_scheduler.py", "compiled_trees.py"]]
+
+
+def data_key(*arrays):
+    digest = hashlib.sha256()
+    for arr in arrays:
+        digest.update(np.ascontiguousarray(arr, dtype="float64").tobytes())
+    return digest.hexdigest()
+
+
+def model_key(filename, model, data_hash, hasher=None):
+    params = {"class": f"{type(model).__module__}.{type(model).__name__}",
+              "params": model.get_params(), "data": data_hash}
+    return stage_key(f"fit:{filename}", code=TRAINING_CODE, params=params, hasher=hasher)
+
+
+def model_outputs(filename):
+    return [os.path.join(model_path, filename), ModelRegistry(model_path).compiled_dir(filename)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--no-cache", action="store_true", help="retrain every model even if it is cached")
+    args = parser.parse_args()
+
+    print("🔄 Loading processed dataset...")
+    with span("load") as s:
+        data = load_data(columns=FEATURES)
+        s.rows = len(data)
+
+    # -----------------------------
+    # CREATE ENGINEERED FEATURES
+    # -----------------------------
+    with span("feature_engineering", rows=len(data)):
+        data["Housing_Market_Interaction"] = (
+            data["City_Housing_Starts"] * data["market_heat_index"]
+        )
+
+        data["Housing_Sales_Ratio"] = (
+            data["City_Housing_Starts"] / (data["sales_count_nowcast"] + 1)
+        )
+
+    # Gaps longer than max_fill_gap are left missing by preprocessing
+    data = data.dropna(subset=FEATURES)
+
+    X = data[FEATURES].copy()
+    y = data[TARGET].copy()
+
+    # -----------------------------
+    # TRAIN/TEST SPLIT
+    # -----------------------------
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42
+    )
+
+    # -----------------------------
+    # SCALE FEATURES
+    # -----------------------------
+    scaler = StandardScaler()
+    with span("scale", rows=len(X)):
+        X_train_scaled = scaler.fit_transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
+
+    pickle.dump(scaler, open(model_path + "scaler.pkl", "wb"))
+    print("📌 Saved scaler.pkl")
+
+
+    # -----------------------------
+    # TRAIN & SAVE ALL MODELS
+    # -----------------------------
+    # Models whose key is cached are restored instead of retrained
+    cache, hasher = ArtifactCache(), Hasher()
+    data_hash = data_key(X_train_scaled, y_train, X_test_scaled[:1000])
+    keys = {filename: model_key(filename, model, data_hash, hasher) for filename, model in models.items()}
+    hasher.save()
+    stale = {}
+    for filename, model in models.items():
+        if not args.no_cache and cache.restore(keys[filename], model_outputs(filename)):
+            print(f"♻️ {filename} unchanged, restored from cache")
+        else:
+            stale[filename] = model
+
+    print(f"\n🚀 Starting model training ({len(stale)} of {len(models)} models)...\n")
+
+    with span("fit", rows=len(X_train_scaled), models=len(stale)):
+        report = train_models(stale, X_train_scaled, y_train.to_numpy(), model_path) if stale else []
+    report += [{"model": filename, "cached": True} for filename in models if filename not in stale]
+    os.makedirs("./outputs", exist_ok=True)
+    with open("./outputs/training_report.json", "w") as f:
+        json.dump(report, f, indent=4)
+
+    print("\n🎉 ALL MODELS TRAINED AND SAVED SUCCESSFULLY!\n")
+
+    print("📦 Exporting tree ensembles to flat arrays...")
+    for filename in stale:
+        meta = export_compiled(filename, X_test_scaled[:1000])
+        if meta is not None:
+            print(f"   ✔ {filename}: {meta['n_trees']} trees, {meta['n_nodes']:,} nodes "
+                  f"(max abs diff vs pickle {meta['max_abs_error']:.2e})")
+        cache.store(keys[filename], model_outputs(filename), name=filename)
+
+    print("\n🔍 Loading trained models for evaluation...")
+
+    # Load models you trained
+    xgb_model = pickle.load(open("./models/xgboost.pkl", "rb"))
+    rf_model = pickle.load(open("./models/random_forest.pkl", "rb"))
+    lgbm_model = pickle.load(open("./models/lightgbm.pkl", "rb"))
+    linear_model = pickle.load(open("./models/linear_regression.pkl", "rb"))
+    tree_model = pickle.load(open("./models/decision_tree.pkl", "rb"))
+
+    # Dictionary to store metrics
+    results = {}
+
+    def evaluate_model(name, model, X_test_scaled, y_test):
+        with span(f"evaluate:{name}", rows=len(X_test_scaled)):
+            preds = model.predict(X_test_scaled)
+        mae = mean_absolute_error(y_test, preds)
+        r2 = r2_score(y_test, preds)
+
+        results[name] = {"MAE": mae, "R2": r2}
+        print(f"\n📌 {name} Evaluation:")
+        print(f"   MAE = {mae:,.4f}")
+        print(f"   R²  = {r2:,.4f}")
+
+    # Run evaluation
+    evaluate_model("XGBoost", xgb_model, X_test_scaled, y_test)
+    evaluate_model("Random Forest", rf_model, X_test_scaled, y_test)
+    evaluate_model("LightGBM", lgbm_model, X_test_scaled, y_test)
+    evaluate_model("Linear Regression", linear_model, X_test_scaled, y_test)
+    evaluate_model("Decision Tree", tree_model, X_test_scaled, y_test)
+
+    # Save metrics
+    with open("./outputs/model_metrics.json", "w") as f:
+        json.dump(results, f, indent=4)
+
+    print("\n🎉 Evaluation complete! Metrics saved in outputs/model_metrics.json")
@@ -0,0 +1,224 @@
+import pandas as pd
+import numpy as np
+import argparse
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import xgboost as xgb
+import lightgbm as lgb
+from sklearn.preprocessing import StandardScaler
+from feature_store import iter_batches, store_path
+from features import FEATURES, TARGET, add_interaction_features
+from instrumentation import span
+
+# -----------------------------
+# PATHS
+# -----------------------------
+model_path = "./Models/"
+output_path = "./outputs/"
+
+# Models that can be fitted from chunks; the rest of the zoo needs the whole
+# matrix in memory (model_training.py)
+OUT_OF_CORE_MODELS = ["xgboost.pkl", "lightgbm.pkl"]
+
+BASE_COLUMNS = ["RegionID", "Date"] + [c for c in FEATURES if c not in ("Housing_Market_Interaction", "Housing_Sales_Ratio")]
+
+
+# -----------------------------
+# CHUNKED INPUT
+# -----------------------------
+# Model rows of one store batch. Every (RegionID, Date) lands in the test set
+# with probability `test_share`, decided by a hash so that each pass over the
+# store splits identically without holding row ids in memory.
+def prepare_batch(batch, test_share=0.2):
+    batch = add_interaction_features(batch).dropna(subset=FEATURES)
+    hashed = pd.util.hash_pandas_object(batch[["RegionID", "Date"]], index=False).to_numpy()
+    is_test = (hashed % 1000) < test_share * 1000
+    return batch[FEATURES].to_numpy(dtype="float64"), batch[TARGET].to_numpy(dtype="float64"), is_test
+
+
+# Pass 1 (only without a saved scaler): fit the scaler on training rows
+def fit_scaler(chunk_rows, test_share, path=store_path):
+    scaler = StandardScaler()
+    for batch in iter_batches(BASE_COLUMNS, chunk_rows, path):
+        X, _, is_test = prepare_batch(batch, test_share)
+        if (~is_test).any():
+            scaler.partial_fit(pd.DataFrame(X[~is_test], columns=FEATURES))
+    return scaler
+
+
+# Pass 2: write scaled chunks to `spool_dir`, one .npy pair per batch
+# and split. Returns the train and test chunk file lists.
+def spool(scaler, spool_dir, chunk_rows, test_share, path=store_path):
+    files = {"train": [], "test": []}
+    for k, batch in enumerate(iter_batches(BASE_COLUMNS, chunk_rows, path)):
+        X, y, is_test = prepare_batch(batch, test_share)
+        X = scaler.transform(pd.DataFrame(X, columns=FEATURES))
+        for split, rows in [("train", ~is_test), ("test", is_test)]:
+            if rows.any():
+                stem = os.path.join(spool_dir, f"{split}-{k:05d}")
+                np.save(stem + "-X.npy", X[rows])
+                np.save(stem + "-y.npy", y[rows])
+                files[split].append(stem)
+    return files
+
+
+def load_chunk(stem):
+    return np.load(stem + "-X.npy", mmap_mode="r"), np.load(stem + "-y.npy", mmap_mode="r")
+
+
+# XGBoost pulls one spooled chunk at a time while it builds its quantized matrix
+class ChunkIter(xgb.DataIter):
+    def __init__(self, stems, cache_prefix=None):
+        self.stems = stems
+        self._k = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._k == len(self.stems):
+            return False
+        X, y = load_chunk(self.stems[self._k])
+        input_data(data=np.asarray(X), label=np.asarray(y))
+        self._k += 1
+        return True
+
+    def reset(self):
+        self._k = 0
+
+
+# LightGBM samples rows for bin boundaries, then pushes the chunks in batches
+class ChunkSequence(lgb.Sequence):
+    def __init__(self, stem, batch_size=10_000):
+        self.X, _ = load_chunk(stem)
+        self.batch_size = batch_size
+
+    def __getitem__(self, idx):
+        return np.asarray(self.X[idx])
+
+    def __len__(self):
+        return len(self.X)
+
+
+# -----------------------------
+# FITTING
+# -----------------------------
+# Train from chunk files with the hyperparameters of an XGBRegressor. The
+# booster is loaded back into an XGBRegressor through its serialized model,
+# so it is served like any other pickle (registry, compiled export, SHAP).
+def fit_xgboost(template, stems, external_memory=False, cache_dir=None):
+    params = template.get_xgb_params()
+    if external_memory:
+        it = ChunkIter(stems, cache_prefix=os.path.join(cache_dir, "xgb"))
+        dtrain = xgb.ExtMemQuantileDMatrix(it, max_bin=template.get_params().get("max_bin") or 256)
+    else:
+        dtrain = xgb.QuantileDMatrix(ChunkIter(stems), max_bin=template.get_params().get("max_bin") or 256)
+    booster = xgb.train(params, dtrain, num_boost_round=template.get_params()["n_estimators"] or 100)
+
+    model = xgb.XGBRegressor(**template.get_params())
+    model.load_model(bytearray(booster.save_raw()))
+    return model
+
+
+# Train from chunk files with the hyperparameters of an LGBMRegressor. The
+# lgb.Booster itself is saved: it predicts like the regressor, and the
+# registry, the compiled export and SHAP all accept it.
+def fit_lightgbm(template, stems):
+    params = {k: v for k, v in template.get_params().items()
+              if k not in ("n_estimators", "importance_type", "class_weight", "n_jobs") and v is not None}
+    params.setdefault("objective", "regression")
+    params["verbose"] = -1
+    if template.n_jobs is not None:
+        params["num_threads"] = template.n_jobs
+
+    label = np.concatenate([np.asarray(load_chunk(stem)[1]) for stem in stems])
+    dataset = lgb.Dataset([ChunkSequence(stem) for stem in stems], label=label, params=params)
+    return lgb.train(params, dataset, num_boost_round=template.n_estimators)
+
+
+# Streamed MAE / R2 over the test chunks (None without test rows)
+def evaluate(model, stems):
+    n, abs_err, sq_err, total, total_sq = 0, 0.0, 0.0, 0.0, 0.0
+    for stem in stems:
+        X, y = load_chunk(stem)
+        preds = np.asarray(model.predict(np.asarray(X)), dtype="float64")
+        n += len(y)
+        abs_err += float(np.abs(y - preds).sum())
+        sq_err += float(((y - preds) ** 2).sum())
+        total += float(y.sum())
+        total_sq += float((y ** 2).sum())
+    if n == 0:
+        return None
+    variance = total_sq - total ** 2 / n
+    return {"MAE": abs_err / n, "R2": 1 - sq_err / variance if variance else float("nan"), "n_test": n}
+
+
+if __name__ == "__main__":
+    from model_training import models, export_compiled
+
+    parser = argparse.ArgumentParser(description="Train XGBoost / LightGBM from the feature store without loading it into memory.")
+    parser.add_argument("--models", nargs="*", default=OUT_OF_CORE_MODELS, choices=OUT_OF_CORE_MODELS)
+    parser.add_argument("--store", default=store_path)
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--test-share", type=float, default=0.2)
+    parser.add_argument("--external-memory", action="store_true",
+                        help="keep XGBoost's quantized pages on disk instead of in RAM")
+    parser.add_argument("--refit-scaler", action="store_true",
+                        help="fit a new scaler.pkl (the other models must then be retrained too)")
+    args = parser.parse_args()
+
+    # Reusing the saved scaler keeps these models consistent with the rest of the zoo
+    scaler_file = os.path.join(model_path, "scaler.pkl")
+    if os.path.exists(scaler_file) and not args.refit_scaler:
+        print("📌 Using saved scaler.pkl")
+        with open(scaler_file, "rb") as f:
+            scaler = pickle.load(f)
+    else:
+        print("🔄 Fitting scaler over the store in chunks...")
+        with span("scale"):
+            scaler = fit_scaler(args.chunk_rows, args.test_share, args.store)
+        os.makedirs(model_path, exist_ok=True)
+        with open(scaler_file, "wb") as f:
+            pickle.dump(scaler, f)
+        print("📌 Saved scaler.pkl")
+
+    spool_dir = tempfile.mkdtemp(prefix="out_of_core_")
+    try:
+        print(f"🔄 Spooling scaled chunks of {args.chunk_rows:,} rows to {spool_dir}...")
+        with span("load") as s:
+            files = spool(scaler, spool_dir, args.chunk_rows, args.test_share, args.store)
+            s.rows = len(files["train"]) + len(files["test"])
+
+        results = {}
+        for filename in args.models:
+            print(f"➡️ Training {filename} out of core ({len(files['train'])} chunks)...")
+            with span(f"fit:{filename}"):
+                if filename == "xgboost.pkl":
+                    model = fit_xgboost(models[filename], files["train"], args.external_memory, spool_dir)
+                else:
+                    model = fit_lightgbm(models[filename], files["train"])
+            with open(os.path.join(model_path, filename), "wb") as f:
+                pickle.dump(model, f)
+
+            if files["test"]:
+                with span(f"evaluate:{filename}"):
+                    results[filename] = evaluate(model, files["test"])
+                print(f"   ✔ Saved {filename}  MAE = {results[filename]['MAE']:,.4f}  R² = {results[filename]['R2']:,.4f}")
+            else:
+                print(f"   ✔ Saved {filename}  (no test rows at --test-share {args.test_share}, evaluation skipped)")
+
+            X_check, _ = load_chunk((files["test"] or files["train"])[0])
+            export_compiled(filename, np.asarray(X_check[:1000], dtype="float64"))
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+    # Merge into earlier results, so training one model keeps the other's metrics
+    metrics_file = os.path.join(output_path, "out_of_core_metrics.json")
+    if os.path.exists(metrics_file):
+        with open(metrics_file) as f:
+            results = {**json.load(f), **results}
+    os.makedirs(output_path, exist_ok=True)
+    with open(metrics_file, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"\n🎉 Metrics saved in {metrics_file}")
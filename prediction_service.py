@@ -0,0 +1,348 @@
+import pandas as pd
+import numpy as np
+import argparse
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from feature_store import load_panel, store_path
+from features import FEATURES, with_extra_units
+from model_registry import ModelRegistry
+from city_index import CityIndex
+from instrumentation import span
+
+# -----------------------------
+# SETTINGS
+# -----------------------------
+model_path = "./Models/"
+default_model = "xgboost.pkl"
+
+# A batch is scored as soon as it holds `max_batch_rows` feature rows or the
+# oldest request in it has waited `max_wait_ms`
+max_wait_ms = 5.0
+max_batch_rows = 50_000
+
+# Latencies kept for the percentiles reported by /metrics
+latency_window = 10_000
+
+
+# -----------------------------
+# METRICS
+# -----------------------------
+def percentiles(values, qs=(50, 95, 99)):
+    if not values:
+        return {f"p{q}": None for q in qs} | {"max": None}
+    array = np.fromiter(values, dtype="float64")
+    return {f"p{q}": round(float(np.percentile(array, q)), 3) for q in qs} | {"max": round(float(array.max()), 3)}
+
+
+class ServiceMetrics:
+    def __init__(self, window=latency_window):
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.rows = 0
+        self.batches = 0
+        self.batch_requests = 0
+        self.latency_ms = deque(maxlen=window)
+        self.queue_ms = deque(maxlen=window)
+        self.batch_ms = deque(maxlen=window)
+
+    def request_done(self, latency_ms, error=False):
+        self.requests += 1
+        self.errors += int(error)
+        self.latency_ms.append(latency_ms)
+
+    def batch_done(self, n_requests, n_rows, seconds, waits_ms):
+        self.batches += 1
+        self.batch_requests += n_requests
+        self.rows += n_rows
+        self.batch_ms.append(seconds * 1000)
+        self.queue_ms.extend(waits_ms)
+
+    def snapshot(self):
+        uptime = time.time() - self.started
+        return {
+            "uptime_s": round(uptime, 1),
+            "requests": self.requests,
+            "errors": self.errors,
+            "requests_per_s": round(self.requests / uptime, 1) if uptime else None,
+            "rows_scored": self.rows,
+            "rows_per_s": round(self.rows / uptime, 1) if uptime else None,
+            "batches": self.batches,
+            "mean_requests_per_batch": round(self.batch_requests / self.batches, 2) if self.batches else None,
+            "mean_rows_per_batch": round(self.rows / self.batches, 1) if self.batches else None,
+            "latency_ms": percentiles(self.latency_ms),
+            "queue_wait_ms": percentiles(self.queue_ms),
+            "batch_predict_ms": percentiles(self.batch_ms),
+        }
+
+
+# -----------------------------
+# MICRO-BATCHING
+# -----------------------------
+# One batcher per model. Requests queue up while the previous batch is being
+# scored and the next batch takes everything queued (up to `max_rows`). When
+# more than one request was already waiting, i.e. the service is under
+# concurrent load, the batch also stays open up to `max_wait_ms` after its
+# first request for more to arrive; a lone request is scored right away. The
+# whole batch is scaled and scored with a single model.predict call on a
+# worker thread, so the event loop keeps accepting requests meanwhile.
+class MicroBatcher:
+    def __init__(self, model_file, registry, scaler, executor, metrics,
+                 max_wait_ms=max_wait_ms, max_rows=max_batch_rows):
+        self.model_file = model_file
+        self.registry = registry
+        self.scaler = scaler
+        self.executor = executor
+        self.metrics = metrics
+        self.max_wait = max_wait_ms / 1000
+        self.max_rows = max_rows
+        self.queue = asyncio.Queue()
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    # Score `stacked` (rows in FEATURES order, extra units already applied)
+    async def predict(self, stacked):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((stacked, future, time.perf_counter()))
+        return await future
+
+    def _score(self, blocks):
+        flat = np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+        model = self.registry.get(self.model_file)
+        with span("serve:batch", rows=len(flat), model=self.model_file, requests=len(blocks)):
+            scaled = self.scaler.transform(pd.DataFrame(flat, columns=FEATURES))
+            return np.asarray(model.predict(scaled), dtype="float64")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            rows = len(batch[0][0])
+            deadline = batch[0][2] + self.max_wait if not self.queue.empty() else 0
+            while rows < self.max_rows:
+                try:
+                    if self.queue.empty():
+                        remaining = deadline - time.perf_counter()
+                        if remaining <= 0:
+                            break
+                        item = await asyncio.wait_for(self.queue.get(), remaining)
+                    else:
+                        item = self.queue.get_nowait()
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                rows += len(item[0])
+
+            started = time.perf_counter()
+            waits = [(started - queued) * 1000 for _, _, queued in batch]
+            try:
+                preds = await loop.run_in_executor(self.executor, self._score, [stacked for stacked, _, _ in batch])
+            except Exception as e:
+                # Rescore each request on its own so only the failing one errors
+                for stacked, future, _ in batch:
+                    try:
+                        result = e if len(batch) == 1 else await loop.run_in_executor(self.executor, self._score, [stacked])
+                    except Exception as single:
+                        result = single
+                    if not future.done():
+                        if isinstance(result, Exception):
+                            future.set_exception(result)
+                        else:
+                            future.set_result(result)
+                continue
+            self.metrics.batch_done(len(batch), rows, time.perf_counter() - started, waits)
+
+            offset = 0
+            for stacked, future, _ in batch:
+                if not future.done():
+                    future.set_result(preds[offset:offset + len(stacked)])
+                offset += len(stacked)
+
+
+# -----------------------------
+# PREDICTION SERVICE
+# -----------------------------
+# Everything the dashboard loads per server process (city index, scaler,
+# models) is loaded once and stays resident for every request. Models are
+# unpickled rather than served from their flat-array exports by default:
+# the exports start faster, but the native predictors score large batches
+# several times faster, which is what a long-running service needs.
+class PredictionService:
+    def __init__(self, models_dir=model_path, store=store_path, max_wait_ms=max_wait_ms,
+                 max_rows=max_batch_rows, max_models=4, threads=2, use_compiled=False):
+        self.models_dir = models_dir
+        self.max_wait_ms = max_wait_ms
+        self.max_rows = max_rows
+        self.registry = ModelRegistry(models_dir, max_models=max_models, use_compiled=use_compiled)
+        self.scaler = self.registry.get("scaler.pkl")
+        self.city_index = CityIndex(load_panel(columns=["RegionName", "Date"] + FEATURES, path=store).to_frame(), FEATURES)
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self.metrics = ServiceMetrics()
+        self.batchers = {}
+        # Models served by this process, listed once at startup (a model file
+        # rewritten in place is still picked up: the registry re-hashes it)
+        self.models = sorted(f for f in os.listdir(models_dir) if f.endswith(".pkl") and f != "scaler.pkl")
+
+    def batcher(self, model_file):
+        if model_file not in self.batchers:
+            self.batchers[model_file] = MicroBatcher(model_file, self.registry, self.scaler, self.executor,
+                                                     self.metrics, self.max_wait_ms, self.max_rows)
+        return self.batchers[model_file]
+
+    # Same inputs as the dashboard: a city, a model and extra housing units.
+    # `last` (a positive integer) limits the response to the most recent months.
+    async def predict(self, request):
+        if not isinstance(request, dict):
+            raise TypeError("Request body must be a JSON object")
+        city = request.get("city")
+        if city not in self.city_index:
+            raise LookupError(f"Unknown city: {city!r}")
+        model_file = request.get("model", default_model)
+        if model_file not in self.models:
+            raise LookupError(f"Unknown model: {model_file!r}")
+
+        extra = np.atleast_1d(np.asarray(request.get("extra_units", [0]), dtype="float64"))
+        if extra.size == 0 or not np.isfinite(extra).all():
+            raise ValueError("extra_units must be a non-empty list of finite numbers")
+        dates, X = self.city_index.get(city)
+        last = request.get("last")
+        if last is not None:
+            if isinstance(last, bool) or not isinstance(last, int) or last < 1:
+                raise ValueError(f"last must be a positive integer, got {last!r}")
+            dates, X = dates[-last:], X[-last:]
+
+        stacked = with_extra_units(np.broadcast_to(X, (len(extra),) + X.shape), extra.reshape(-1, 1))
+        preds = await self.batcher(model_file).predict(stacked.reshape(-1, X.shape[-1]))
+        preds = preds.reshape(len(extra), len(X))
+        return {
+            "city": city,
+            "model": model_file,
+            "dates": pd.DatetimeIndex(dates).strftime("%Y-%m-%d").tolist(),
+            "extra_units": extra.tolist(),
+            "predictions": preds.tolist(),
+            "mean": preds.mean(axis=1).tolist() if len(X) else [None] * len(extra),
+        }
+
+    async def route(self, method, path, body):
+        if method == "POST" and path == "/predict":
+            try:
+                request = json.loads(body or b"{}")
+            except ValueError:
+                return 400, {"error": "Request body is not valid JSON"}
+            try:
+                return 200, await self.predict(request)
+            except LookupError as e:
+                return 404, {"error": str(e)}
+            except (TypeError, ValueError) as e:
+                return 400, {"error": str(e)}
+        if method == "GET" and path == "/metrics":
+            return 200, self.metrics.snapshot() | {"models_loaded": self.registry.cached()}
+        if method == "GET" and path == "/cities":
+            return 200, {"cities": self.city_index.cities}
+        if method == "GET" and path == "/models":
+            return 200, {"models": self.models}
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok"}
+        return 404, {"error": f"No route for {method} {path}"}
+
+
+# -----------------------------
+# HTTP
+# -----------------------------
+# Minimal HTTP/1.1 over asyncio streams (JSON in, JSON out, keep-alive), so
+# the service needs nothing beyond the standard library.
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+
+
+async def read_request(reader):
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    method, target, version = line.decode("latin-1").split()
+    headers = {}
+    while True:
+        header = await reader.readline()
+        if header in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = header.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get("content-length", 0)))
+    keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+    return method, urlsplit(target).path, body, keep_alive
+
+
+def write_response(writer, status, payload, keep_alive):
+    body = json.dumps(payload).encode()
+    writer.write(
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body
+    )
+
+
+async def handle_connection(service, reader, writer):
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except (asyncio.IncompleteReadError, ValueError):
+                break
+            if request is None:
+                break
+            method, path, body, keep_alive = request
+
+            start = time.perf_counter()
+            try:
+                status, payload = await service.route(method, path, body)
+            except Exception as e:
+                status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+            if path == "/predict":
+                service.metrics.request_done((time.perf_counter() - start) * 1000, error=status != 200)
+
+            write_response(writer, status, payload, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(service, host, port):
+    server = await asyncio.start_server(lambda r, w: handle_connection(service, r, w), host, port)
+    print(f"🚀 Serving predictions on http://{host}:{port} "
+          f"(batch window {service.max_wait_ms:g} ms, up to {service.max_rows:,} rows)")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP prediction service with request micro-batching.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--models-dir", default=model_path)
+    parser.add_argument("--store", default=store_path)
+    parser.add_argument("--preload", nargs="*", default=[default_model], help="models loaded before serving")
+    parser.add_argument("--max-wait-ms", type=float, default=max_wait_ms,
+                        help="longest a request waits for others to join its batch (0 disables batching delay)")
+    parser.add_argument("--max-batch-rows", type=int, default=max_batch_rows)
+    parser.add_argument("--threads", type=int, default=2, help="threads scoring batches of different models")
+    parser.add_argument("--compiled", action="store_true", help="serve tree models from their flat-array exports")
+    args = parser.parse_args()
+
+    print("🔄 Loading city index and models...")
+    service = PredictionService(args.models_dir, args.store, args.max_wait_ms, args.max_batch_rows,
+                                threads=args.threads, use_compiled=args.compiled)
+    service.registry.preload(args.preload)
+    print(f"📌 {len(service.city_index)} cities, models resident: {', '.join(service.registry.cached())}")
+
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n🛑 Stopped")
@@ -0,0 +1,119 @@
+import pandas as pd
+import numpy as np
+import os
+import shutil
+
+# -----------------------------
+# PATHS AND SETTINGS
+# -----------------------------
+rollups_path = "./data/processed/rollups/"
+
+# Metrics summarized for the EDA scripts and the dashboard
+ROLLUP_METRICS = [
+    "median_sale_price_all_homes",
+    "zhvi_all_homes_smoothed",
+    "City_Housing_Starts",
+    "market_heat_index",
+    "percent_sold_above_list_all_homes",
+    "percent_sold_below_list_all_homes",
+    "sales_count_nowcast",
+]
+ROLLUP_KEYS = ["RegionName", "StateName", "Date"]
+ROLLUP_COLUMNS = ROLLUP_KEYS + ROLLUP_METRICS
+
+QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+HISTOGRAM_BINS = 30
+
+# Rollup name -> (grouping keys, quantiles). States hold few metros each, so
+# they only get the median; histograms and correlation have no keys.
+ROLLUPS = {
+    "by_date": (["Date"], QUANTILES),
+    "by_state": (["StateName", "Date"], [0.5]),
+    "by_region": (["RegionName", "StateName"], QUANTILES),
+    "histograms": (None, None),
+    "correlation": (None, None),
+}
+
+
+# -----------------------------
+# AGGREGATES
+# -----------------------------
+# One row per (keys, metric): count, mean, min, quantiles and max of the
+# non-missing values, stored as float32 (they only feed charts)
+def summarize(df, keys, metrics=ROLLUP_METRICS, quantiles=QUANTILES):
+    long = df[keys + metrics].melt(id_vars=keys, var_name="metric").dropna(subset=["value"])
+    grouped = long.groupby(keys + ["metric"], observed=True, sort=True)["value"]
+    stats = grouped.agg(["count", "mean", "min", "max"])
+    names = [f"p{round(q * 100)}" for q in quantiles]
+    stats = stats.join(grouped.quantile(quantiles).unstack().set_axis(names, axis=1))
+    stats = stats[["count", "mean", "min"] + names + ["max"]]
+    stats = stats.astype({c: "float32" for c in stats.columns if c != "count"}).astype({"count": "int32"})
+    return stats.reset_index()
+
+
+# Fixed-width bins spanning each metric's observed range:
+# metric, left, right, count
+def histograms(df, metrics=ROLLUP_METRICS, bins=HISTOGRAM_BINS):
+    parts = []
+    for metric in metrics:
+        values = df[metric].to_numpy(dtype="float64")
+        values = values[np.isfinite(values)]
+        if not len(values):
+            continue
+        counts, edges = np.histogram(values, bins=bins)
+        parts.append(pd.DataFrame({"metric": metric, "left": edges[:-1], "right": edges[1:], "count": counts}))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=["metric", "left", "right", "count"])
+
+
+# Pairwise Pearson correlation of the metrics, with a `metric` column for the rows
+def correlation(df, metrics=ROLLUP_METRICS):
+    return df[metrics].corr().rename_axis("metric").reset_index()
+
+
+# All rollups of a processed panel, keyed by name. Only the columns present
+# in `df` are summarized.
+def build_rollups(df, metrics=ROLLUP_METRICS, bins=HISTOGRAM_BINS):
+    metrics = [m for m in metrics if m in df.columns]
+    df = df.copy()
+    df["Date"] = pd.to_datetime(df["Date"])
+    for col in ["RegionName", "StateName"]:
+        if col in df.columns:
+            df[col] = df[col].astype(object)
+
+    rollups = {}
+    for name, (keys, quantiles) in ROLLUPS.items():
+        if keys is not None and all(k in df.columns for k in keys):
+            rollups[name] = summarize(df, keys, metrics, quantiles)
+    rollups["histograms"] = histograms(df, metrics, bins)
+    rollups["correlation"] = correlation(df, metrics)
+    return rollups
+
+
+# -----------------------------
+# STORAGE
+# -----------------------------
+# One small Parquet file per rollup, replaced as a whole on every build
+def write_rollups(rollups, path=rollups_path):
+    tmp = path.rstrip("/") + ".tmp"
+    if os.path.exists(tmp):
+        shutil.rmtree(tmp)
+    os.makedirs(tmp)
+    for name, frame in rollups.items():
+        frame.to_parquet(os.path.join(tmp, f"{name}.parquet"), index=False)
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(tmp, path)
+    return path
+
+
+def load_rollup(name, path=rollups_path):
+    if name not in ROLLUPS:
+        raise KeyError(f"Unknown rollup {name!r}, expected one of {list(ROLLUPS)}")
+    file = os.path.join(path, f"{name}.parquet")
+    if not os.path.exists(file):
+        raise FileNotFoundError(f"{file} not found. Run `python data_preprocessing.py` to build the rollups.")
+    return pd.read_parquet(file)
+
+
+def rollups_size(path=rollups_path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
@@ -0,0 +1,155 @@
+import argparse
+import ast
+import os
+import subprocess
+import sys
+import time
+from artifact_cache import ArtifactCache, Hasher, stage_key, cache_path, max_cache_bytes
+from feature_store import store_path
+from rollups import rollups_path
+from serving_snapshot import snapshot_path
+
+REPO = os.path.dirname(os.path.abspath(__file__))
+
+
+# Source files of `scripts` and of every repo module they import, directly or
+# through other repo modules (function-level imports included), so a change
+# to any code a stage runs changes its key
+def code(*scripts):
+    found, stack = [], list(scripts)
+    while stack:
+        name = stack.pop()
+        path = os.path.join(REPO, name)
+        if path in found or not os.path.exists(path):
+            continue
+        found.append(path)
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                stack += [alias.name.split(".")[0] + ".py" for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                stack.append(node.module.split(".")[0] + ".py")
+    return sorted(found)
+
+
+# What model_training.py writes into ./Models/: the scaler, one pickle per
+# model and a flat-array export per tree model. Only these are cached and
+# restored; other files there (lstm_model.h5, ...) are never touched.
+model_dir = "./Models/"
+MODEL_FILES = ["random_forest.pkl", "gradient_boosting.pkl", "xgboost.pkl", "lightgbm.pkl",
+               "decision_tree.pkl", "linear_regression.pkl", "lasso_regression.pkl"]
+TRAINED_MODELS = ([os.path.join(model_dir, "scaler.pkl")]
+                  + [os.path.join(model_dir, name) for name in MODEL_FILES]
+                  + [os.path.join(model_dir, "compiled", os.path.splitext(name)[0]) for name in MODEL_FILES])
+
+
+# -----------------------------
+# PIPELINE DAG
+# -----------------------------
+# Every stage lists the stages it depends on, the files and directories it
+# reads (raw data or upstream outputs), the source files it runs and the
+# outputs it produces. Its cache key covers all of them, so a stage reruns
+# only when something it reads changed. model_training.py additionally keeps
+# one cache entry per model and retrains only the models whose key changed.
+STAGES = {
+    "preprocess": {
+        "deps": [],
+        "command": ["data_preprocessing.py"],
+        "inputs": ["./data/raw/"],
+        "code": code("data_preprocessing.py"),
+        "outputs": [store_path, rollups_path, "./outputs/panel_precision_report.csv"],
+    },
+    "train": {
+        "deps": ["preprocess"],
+        "command": ["model_training.py"],
+        "inputs": [store_path, "./outputs/hyperparameter_search/best_params.json"],
+        "code": code("model_training.py"),
+        "outputs": TRAINED_MODELS + ["./outputs/training_report.json", "./outputs/model_metrics.json"],
+    },
+    "shap": {
+        "deps": ["train"],
+        "command": ["shap_analysis.py"],
+        "inputs": [store_path, "./models/xgboost.pkl", "./models/scaler.pkl"],
+        "code": code("shap_analysis.py"),
+        "outputs": ["./outputs/shap_summary_plot.png"],
+    },
+    "snapshot": {
+        "deps": ["train"],
+        "command": ["serving_snapshot.py"],
+        "inputs": [store_path, "./Models/scaler.pkl"],
+        "code": code("serving_snapshot.py"),
+        "outputs": [snapshot_path],
+    },
+}
+
+
+def topological_order(stages):
+    order, seen = [], set()
+
+    def visit(name):
+        if name in seen:
+            return
+        seen.add(name)
+        for dep in stages[name]["deps"]:
+            visit(dep)
+        order.append(name)
+
+    for name in stages:
+        visit(name)
+    return order
+
+
+# Run the selected stages (and their dependencies) in order, skipping every
+# stage whose key is already cached. Keys are computed just before a stage
+# runs, so they see the outputs its dependencies just produced.
+def run(selected=None, force=(), cache=None):
+    cache = cache or ArtifactCache()
+    wanted = set(selected or STAGES)
+    for name in list(wanted):
+        stack = [name]
+        while stack:
+            for dep in STAGES[stack.pop()]["deps"]:
+                if dep not in wanted:
+                    wanted.add(dep)
+                    stack.append(dep)
+
+    summary = []
+    for name in [s for s in topological_order(STAGES) if s in wanted]:
+        stage = STAGES[name]
+        hasher = Hasher(cache.root)
+        key = stage_key(name, stage["inputs"], stage["code"], {"command": stage["command"]}, hasher)
+        hasher.save()
+
+        if name not in force and cache.restore(key, stage["outputs"]):
+            print(f"♻️ {name}: inputs unchanged ({key[:12]}), outputs restored from cache")
+            summary.append((name, "cached", 0.0))
+            continue
+
+        print(f"➡️ {name}: running {' '.join(stage['command'])} ({key[:12]})")
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(REPO, stage["command"][0])] + stage["command"][1:], check=True)
+        seconds = time.perf_counter() - start
+        cache.store(key, stage["outputs"], name=name)
+        summary.append((name, "ran", seconds))
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the pipeline, skipping stages whose inputs did not change.")
+    parser.add_argument("stages", nargs="*", help=f"stages to run: {', '.join(STAGES)} (default: all)")
+    parser.add_argument("--force", nargs="*", default=[], choices=list(STAGES), help="rerun these stages regardless")
+    parser.add_argument("--cache-dir", default=cache_path)
+    parser.add_argument("--max-cache-gb", type=float, default=max_cache_bytes / 2**30,
+                        help="evict least recently used artifacts beyond this size")
+    args = parser.parse_args()
+    unknown = [name for name in args.stages if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    cache = ArtifactCache(args.cache_dir, int(args.max_cache_gb * 2**30))
+    summary = run(args.stages or None, set(args.force), cache)
+
+    print("\n🎉 Pipeline finished:")
+    for name, status, seconds in summary:
+        print(f"   {name:<12} {status:<7} {seconds:8.1f}s")
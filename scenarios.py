@@ -0,0 +1,55 @@
+import numpy as np
+from features import FEATURES, with_extra_units
+from instrumentation import span
+
+# pandas is imported only where a frame is built, so the dashboard can score
+# scenarios before (or without) importing it
+
+
+# -----------------------------
+# WHAT-IF SCENARIOS
+# -----------------------------
+# Score one feature matrix X (rows in FEATURES order) under every value in
+# `extra_units`. All scenarios are stacked into one (scenario x row) block,
+# scaled once and scored with a single model.predict call. Scalers fitted on
+# a DataFrame get one; plain scalers (serving snapshot) get the array.
+# Returns an array of shape (len(extra_units), len(X)).
+def score_scenarios(model, scaler, X, extra_units):
+    extra = np.asarray(extra_units, dtype="float64").reshape(-1, 1)
+    stacked = with_extra_units(np.broadcast_to(X, (len(extra),) + X.shape), extra)
+    flat = stacked.reshape(-1, X.shape[-1])
+    with span("predict", rows=len(flat), model=type(model).__name__):
+        if hasattr(scaler, "feature_names_in_"):
+            import pandas as pd
+            flat = pd.DataFrame(flat, columns=FEATURES)
+        scaled = scaler.transform(flat)
+        return np.asarray(model.predict(scaled)).reshape(len(extra), len(X))
+
+
+# Sweep `extra_units` over many cities of a CityIndex in one batched call.
+# Returns a tidy frame: extra_units, RegionName, Date, prediction.
+def sweep(model, scaler, city_index, extra_units, cities=None):
+    import pandas as pd
+    cities = list(city_index.cities if cities is None else cities)
+    slices = [city_index.rows(city) for city in cities]
+    rows = np.concatenate([np.arange(s.start, s.stop) for s in slices])
+    lengths = [s.stop - s.start for s in slices]
+
+    extra = np.asarray(extra_units, dtype="float64")
+    preds = score_scenarios(model, scaler, city_index.matrix[rows], extra)
+
+    n_scenarios, n_rows = preds.shape
+    return pd.DataFrame({
+        "extra_units": np.repeat(extra, n_rows),
+        "RegionName": np.tile(np.repeat(cities, lengths), n_scenarios),
+        "Date": np.tile(city_index.dates[rows], n_scenarios),
+        "prediction": preds.ravel(),
+    })
+
+
+# Mean predicted ZHVI per city and unit level, with the change from 0 units
+def response_curve(result):
+    curve = result.groupby(["RegionName", "extra_units"], as_index=False)["prediction"].mean()
+    baseline = curve[curve["extra_units"] == 0].set_index("RegionName")["prediction"]
+    curve["change"] = curve["prediction"] - curve["RegionName"].map(baseline)
+    return curve
@@ -0,0 +1,157 @@
+import pandas as pd
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from features import FEATURES, TARGET
+
+# -----------------------------
+# LSTM INPUTS
+# -----------------------------
+# lstm_model.h5 takes (window=12 months, 2 features) and predicts the next
+# month of the target. The target comes first so forecasts can be fed back.
+SEQUENCE_FEATURES = [TARGET, "City_Housing_Starts"]
+WINDOW = 12
+
+
+# Per-feature (mean, scale) of SEQUENCE_FEATURES taken from the scaler the
+# tree models use (scaler.pkl is fit on FEATURES, which includes both)
+def feature_scaling(scaler, features=SEQUENCE_FEATURES):
+    names = list(getattr(scaler, "feature_names_in_", FEATURES))
+    idx = [names.index(f) for f in features]
+    return np.asarray(scaler.mean_)[idx], np.asarray(scaler.scale_)[idx]
+
+
+# -----------------------------
+# SEQUENCE DATASET
+# -----------------------------
+# The panel sorted once by (region, month) into one contiguous (rows x
+# features) matrix. Every sliding window is a strided view into it, so
+# windows are never copied until a batch of them is handed to the model.
+# A window is valid when it stays inside one region, covers consecutive
+# months and has no missing value.
+class SequenceDataset:
+    def __init__(self, data, features=SEQUENCE_FEATURES, window=WINDOW, key="RegionName",
+                 date_col="Date", scaling=None, dtype="float32"):
+        codes, names = pd.factorize(data[key].astype(str), sort=True)
+        dates = pd.to_datetime(data[date_col]).to_numpy()
+        order = np.lexsort((dates, codes))
+
+        self.features = list(features)
+        self.window = window
+        self.regions = list(names)
+        self.codes = codes[order]
+        self.dates = dates[order]
+
+        values = data[self.features].to_numpy(dtype="float64")[order]
+        if scaling is not None:
+            mean, scale = scaling
+            values = (values - mean) / scale
+        self.scaling = scaling
+        self.values = np.ascontiguousarray(values, dtype=dtype)
+
+        # Month number of every row, to find breaks in the monthly sequence
+        self.months = pd.DatetimeIndex(self.dates).to_period("M").asi8
+        n = len(self.values)
+        breaks = np.ones(n, dtype=bool)
+        breaks[1:] = (self.codes[1:] != self.codes[:-1]) | (self.months[1:] != self.months[:-1] + 1)
+        bad = np.isnan(self.values).any(axis=1)
+
+        # Window starting at row i is valid when rows i+1..i+window-1 are not
+        # breaks and rows i..i+window-1 have no NaN (counted with cumsums)
+        n_windows = max(n - window + 1, 0)
+        breaks_cum = np.concatenate([[0], np.cumsum(breaks)])
+        bad_cum = np.concatenate([[0], np.cumsum(bad)])
+        starts = np.arange(n_windows)
+        inner_breaks = breaks_cum[starts + window] - breaks_cum[starts + 1]
+        self.valid = (inner_breaks == 0) & (bad_cum[starts + window] - bad_cum[starts] == 0)
+
+    # All windows as a read-only (n_windows, window, features) strided view
+    def windows(self):
+        if len(self.values) < self.window:
+            return np.empty((0, self.window, len(self.features)), dtype=self.values.dtype)
+        return sliding_window_view(self.values, self.window, axis=0).transpose(0, 2, 1)
+
+    # Start rows of valid windows; with `horizon`, only windows whose target
+    # `horizon` months after the window end is present in the same region
+    def window_starts(self, horizon=None):
+        starts = np.flatnonzero(self.valid)
+        if horizon is None:
+            return starts
+        target_rows = starts + self.window - 1 + horizon
+        inside = target_rows < len(self.values)
+        starts, target_rows = starts[inside], target_rows[inside]
+        end_rows = starts + self.window - 1
+        same = (self.codes[target_rows] == self.codes[end_rows]) & \
+               (self.months[target_rows] == self.months[end_rows] + horizon) & \
+               ~np.isnan(self.values[target_rows, 0])
+        return starts[same]
+
+    # (X, y) training batches: only `batch_size` windows are copied at a time
+    def batches(self, batch_size=4096, horizon=1):
+        view = self.windows()
+        starts = self.window_starts(horizon)
+        for i in range(0, len(starts), batch_size):
+            chunk = starts[i:i + batch_size]
+            yield view[chunk], self.values[chunk + self.window - 1 + horizon, 0]
+
+    # Latest valid window of every region: (regions, last dates, X); empty
+    # when no region has a complete window
+    def last_windows(self, regions=None):
+        starts = np.flatnonzero(self.valid)
+        if len(starts) == 0:
+            return [], self.dates[:0], self.windows()[:0]
+        region_of = self.codes[starts + self.window - 1]
+        # Last valid window per region (starts are sorted by region, then month)
+        last = np.flatnonzero(np.r_[region_of[1:] != region_of[:-1], True])
+        starts, region_of = starts[last], region_of[last]
+        if regions is not None:
+            wanted = np.isin(np.asarray(self.regions)[region_of], list(regions))
+            starts, region_of = starts[wanted], region_of[wanted]
+        end_dates = self.dates[starts + self.window - 1]
+        return [self.regions[c] for c in region_of], end_dates, self.windows()[starts]
+
+    def unscale_target(self, values):
+        if self.scaling is None:
+            return values
+        mean, scale = self.scaling
+        return values * scale[0] + mean[0]
+
+
+# -----------------------------
+# BATCHED RECURSIVE FORECAST
+# -----------------------------
+def predict_batched(model, X, batch_size=4096):
+    out = np.empty(len(X))
+    for i in range(0, len(X), batch_size):
+        out[i:i + batch_size] = np.asarray(model.predict(X[i:i + batch_size], verbose=0)).reshape(-1)
+    return out
+
+
+# Forecast `steps` months ahead for every region at once. Each step scores
+# all regions' windows in batches, appends the prediction as the newest
+# target value (other features carry their last observed value forward) and
+# slides the windows by one month.
+# Returns a tidy frame: RegionName, Date, step, prediction.
+def forecast(model, dataset, steps=1, regions=None, batch_size=4096):
+    names, end_dates, X = dataset.last_windows(regions)
+    X = np.array(X)
+    preds = np.empty((len(X), steps))
+    for step in range(steps):
+        preds[:, step] = predict_batched(model, X, batch_size)
+        nxt = X[:, -1, :].copy()
+        nxt[:, 0] = preds[:, step]
+        X = np.concatenate([X[:, 1:, :], nxt[:, None, :]], axis=1)
+
+    month_ends = pd.DatetimeIndex(end_dates)
+    dates = np.stack([(month_ends + pd.offsets.MonthEnd(s + 1)).to_numpy() for s in range(steps)], axis=1)
+    return pd.DataFrame({
+        "RegionName": np.repeat(np.asarray(names, dtype=object), steps),
+        "Date": dates.ravel(),
+        "step": np.tile(np.arange(1, steps + 1), len(names)),
+        "prediction": dataset.unscale_target(preds.ravel()),
+    })
+
+
+# Keras is imported only when an LSTM is actually loaded
+def load_lstm(path):
+    from tensorflow import keras
+    return keras.models.load_model(path, compile=False)
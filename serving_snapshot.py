@@ -0,0 +1,219 @@
+import numpy as np
+import argparse
+import hashlib
+import json
+import os
+import time
+
+# Only NumPy and the standard library are imported here: the dashboard loads
+# this module before anything else. pandas, the feature store and the
+# scaler pickle are only needed to build a snapshot.
+
+# -----------------------------
+# PATHS
+# -----------------------------
+# DASHBOARD_SNAPSHOT points the dashboard at another snapshot file (a missing
+# path makes it fall back to the feature store)
+snapshot_path = os.environ.get("DASHBOARD_SNAPSHOT") or "./data/processed/serving_snapshot.bin"
+store_path = "./data/processed/feature_store"
+model_path = "./Models/"
+
+MAGIC = b"ZHVISNAP1\n"
+ALIGN = 64
+
+
+# -----------------------------
+# FRESHNESS
+# -----------------------------
+# Content hash of the store's data part files. The preprocessing manifest and
+# other bookkeeping files are skipped, and parts are keyed by their partition
+# directory, not their file name: every store write gives the parts new random
+# names but the same bytes, so rerunning preprocessing on unchanged data keeps
+# the signature. `known` ({relative path: [size, mtime_ns, sha256]}, as
+# returned earlier) lets files whose size and mtime still match skip re-hashing.
+def store_signature(path=store_path, known=None):
+    known = known or {}
+    files, parts = {}, []
+    for root, _, names in os.walk(path):
+        for name in names:
+            if not name.endswith(".parquet"):
+                continue
+            full = os.path.join(root, name)
+            rel = os.path.relpath(full, path)
+            stat = os.stat(full)
+            record = known.get(rel)
+            if record and record[:2] == [stat.st_size, stat.st_mtime_ns]:
+                digest = record[2]
+            else:
+                digest = file_sha256(full)
+            files[rel] = [stat.st_size, stat.st_mtime_ns, digest]
+            parts.append([os.path.dirname(rel), digest])
+    return hashlib.sha256(json.dumps(sorted(parts)).encode()).hexdigest(), files
+
+
+def file_sha256(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# -----------------------------
+# FILE FORMAT
+# -----------------------------
+# One file: MAGIC, an 8-byte header length, a JSON header, then every array
+# as raw bytes at a 64-byte aligned offset listed in the header. Readers
+# memory-map the arrays in place; nothing is parsed or copied at load time.
+def write_snapshot(path, arrays, header):
+    header = dict(header, arrays={})
+    offset = 0
+    for name, array in arrays.items():
+        offset = -(-offset // ALIGN) * ALIGN
+        header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+
+    encoded = json.dumps(header).encode()
+    data_start = -(-(len(MAGIC) + 8 + len(encoded)) // ALIGN) * ALIGN
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + len(encoded).to_bytes(8, "little") + encoded)
+        for name, array in arrays.items():
+            f.seek(data_start + header["arrays"][name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(tmp, path)
+    return path
+
+
+def read_snapshot(path):
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a serving snapshot")
+        length = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(length))
+    data_start = -(-(len(MAGIC) + 8 + length) // ALIGN) * ALIGN
+
+    arrays = {}
+    for name, info in header["arrays"].items():
+        shape = tuple(info["shape"])
+        if np.prod(shape) == 0:
+            arrays[name] = np.empty(shape, dtype=info["dtype"])
+        else:
+            arrays[name] = np.memmap(path, dtype=info["dtype"], mode="r", offset=data_start + info["offset"], shape=shape)
+    return header, arrays
+
+
+# -----------------------------
+# SERVING OBJECTS
+# -----------------------------
+# StandardScaler.transform from the saved mean and scale, without sklearn
+class ScalerParams:
+    def __init__(self, mean, scale, feature_names):
+        self.mean_ = mean
+        self.scale_ = scale
+        self.feature_names = list(feature_names)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype="float64") - self.mean_) / self.scale_
+
+
+# Same interface as CityIndex (cities, dates, matrix, rows, get), backed by
+# the memory-mapped arrays of a snapshot
+class ServingSnapshot:
+    def __init__(self, header, arrays):
+        self.header = header
+        self.features = header["features"]
+        self.cities = header["cities"]
+        self.dates = arrays["dates"]
+        self.matrix = arrays["matrix"]
+        self.scaler = ScalerParams(arrays["scaler_mean"], arrays["scaler_scale"], self.features)
+        bounds = arrays["bounds"]
+        self._rows = {name: slice(int(bounds[i]), int(bounds[i + 1])) for i, name in enumerate(self.cities)}
+
+    @classmethod
+    def load(cls, path=snapshot_path):
+        return cls(*read_snapshot(path))
+
+    def __len__(self):
+        return len(self.cities)
+
+    def __contains__(self, city):
+        return city in self._rows
+
+    def rows(self, city):
+        return self._rows[city]
+
+    def get(self, city):
+        rows = self._rows[city]
+        return np.asarray(self.dates[rows]), np.asarray(self.matrix[rows])
+
+    # Whether the store and scaler are still the ones the snapshot was built from
+    def is_fresh(self, store=store_path, models_dir=model_path):
+        scaler_file = os.path.join(models_dir, "scaler.pkl")
+        return (os.path.exists(scaler_file)
+                and self.header["scaler_sha256"] == file_sha256(scaler_file)
+                and self.header["store_signature"] == store_signature(store, self.header.get("store_files"))[0])
+
+
+# The snapshot when it exists and matches the current store and scaler, else None
+def load_snapshot(path=snapshot_path, store=store_path, models_dir=model_path):
+    if not os.path.exists(path):
+        return None
+    try:
+        snapshot = ServingSnapshot.load(path)
+    except (ValueError, KeyError, OSError):
+        return None
+    return snapshot if snapshot.is_fresh(store, models_dir) else None
+
+
+# -----------------------------
+# BUILD
+# -----------------------------
+# Everything the dashboard reads before its first chart: the per-city feature
+# matrix and dates (exactly as CityIndex builds them) and the scaler's
+# mean and scale
+def build_snapshot(path=snapshot_path, store=store_path, models_dir=model_path):
+    import pickle
+    from feature_store import load_panel
+    from features import FEATURES
+    from city_index import CityIndex
+
+    index = CityIndex(load_panel(columns=["RegionName", "Date"] + FEATURES, path=store).to_frame(), FEATURES)
+    scaler_file = os.path.join(models_dir, "scaler.pkl")
+    with open(scaler_file, "rb") as f:
+        scaler = pickle.load(f)
+
+    n_features = len(FEATURES)
+    mean = scaler.mean_ if getattr(scaler, "with_mean", True) else np.zeros(n_features)
+    scale = scaler.scale_ if getattr(scaler, "with_std", True) and scaler.scale_ is not None else np.ones(n_features)
+    bounds = np.array([0] + [index.rows(city).stop for city in index.cities], dtype="int64")
+
+    arrays = {
+        "matrix": index.matrix,
+        "dates": np.asarray(index.dates, dtype="datetime64[ns]"),
+        "bounds": bounds,
+        "scaler_mean": np.asarray(mean, dtype="float64"),
+        "scaler_scale": np.asarray(scale, dtype="float64"),
+    }
+    header = {
+        "features": FEATURES,
+        "cities": index.cities,
+        "created": time.time(),
+        "scaler_sha256": file_sha256(scaler_file),
+    }
+    header["store_signature"], header["store_files"] = store_signature(store)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return write_snapshot(path, arrays, header)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the memory-mappable snapshot the dashboard starts from.")
+    parser.add_argument("--output", default=snapshot_path)
+    parser.add_argument("--store", default=store_path)
+    parser.add_argument("--models-dir", default=model_path)
+    args = parser.parse_args()
+
+    print("🔄 Building serving snapshot...")
+    start = time.perf_counter()
+    build_snapshot(args.output, args.store, args.models_dir)
+    snapshot = ServingSnapshot.load(args.output)
+    print(f"   ✔ {len(snapshot)} cities, {snapshot.matrix.shape[0]:,} rows x {snapshot.matrix.shape[1]} features "
+          f"({os.path.getsize(args.output) / 2**20:.1f} MiB) in {time.perf_counter() - start:.1f}s")
+    print(f"🎉 Snapshot saved to {args.output}")
@@ -0,0 +1,78 @@
+import numpy as np
+import os
+import pickle
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from instrumentation import span, drain, record
+
+# Estimators with their own thread pool (n_jobs); everything else fits on one core
+THREADED_MODELS = {"random_forest.pkl", "xgboost.pkl", "lightgbm.pkl"}
+
+
+def peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+# Threads per model so that all concurrently running fits share `total_cores`:
+# single-threaded models take one core each, the tree ensembles split the rest.
+def plan_threads(filenames, total_cores):
+    threaded = [name for name in filenames if name in THREADED_MODELS]
+    single = len(filenames) - len(threaded)
+    per_model = max(1, (total_cores - single) // max(len(threaded), 1))
+    return {name: (per_model if name in threaded else 1) for name in filenames}
+
+
+def _fit_one(filename, model, X_path, y_path, model_path, threads):
+    if filename in THREADED_MODELS:
+        model.set_params(n_jobs=threads)
+
+    # Memory-mapped, so concurrent fits share one copy of the training matrix
+    X = np.load(X_path, mmap_mode="r")
+    y = np.load(y_path, mmap_mode="r")
+
+    start = time.perf_counter()
+    with span(f"fit:{filename}", rows=len(X), threads=threads):
+        model.fit(X, y)
+    seconds = time.perf_counter() - start
+
+    with open(os.path.join(model_path, filename), "wb") as f:
+        pickle.dump(model, f)
+    return {"model": filename, "threads": threads, "seconds": seconds, "peak_rss_mb": peak_rss_mb(),
+            "spans": drain()}
+
+
+# -----------------------------
+# TRAINING SCHEDULER
+# -----------------------------
+# Fit independent models concurrently, each in a fresh process (so its peak
+# RSS is its own), longest-running ensembles first. Returns one report row
+# per model with threads, wall time and peak memory.
+def train_models(models, X_train, y_train, model_path, total_cores=None, max_workers=None):
+    total_cores = total_cores or os.cpu_count() or 1
+    max_workers = max_workers or min(len(models), total_cores)
+    threads = plan_threads(list(models), total_cores)
+    order = sorted(models, key=lambda name: name not in THREADED_MODELS)
+
+    report = []
+    with tempfile.TemporaryDirectory() as tmp:
+        X_path, y_path = os.path.join(tmp, "X_train.npy"), os.path.join(tmp, "y_train.npy")
+        np.save(X_path, np.ascontiguousarray(X_train, dtype="float64"))
+        np.save(y_path, np.ascontiguousarray(y_train, dtype="float64"))
+
+        with ProcessPoolExecutor(max_workers, max_tasks_per_child=1) as pool:
+            futures = {}
+            for name in order:
+                print(f"➡️ Training {name} ({threads[name]} thread(s))...")
+                futures[name] = pool.submit(_fit_one, name, models[name], X_path, y_path, model_path, threads[name])
+            for name in order:
+                row = futures[name].result()
+                record(row.pop("spans"))
+                print(f"   ✔ Saved {name}  ({row['seconds']:.1f}s, {row['threads']} thread(s), "
+                      f"peak {row['peak_rss_mb']:.0f} MB)")
+                report.append(row)
+    return report